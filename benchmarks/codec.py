@@ -0,0 +1,254 @@
+"""Micro-benchmarks for the pytuya message codec.
+
+Measures operations per second and bytes allocated per call for encoding and
+decoding messages with protocol 3.1 and 3.3 and both device types, and
+compares the results with a stored baseline:
+
+    python benchmarks/codec.py                    # compare with baseline
+    python benchmarks/codec.py --update-baseline  # store new baseline
+
+Throughput is compared relative to a calibration workload timed in turns
+with each benchmark, so a baseline recorded on one machine can be used on
+another and changes in machine load have little effect. Benchmarks bound by
+AES in the cryptography library are calibrated against plain AES, the others
+against pure Python code. The exit code is non-zero if any benchmark
+regressed by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "custom_components", "localtuya"))
+
+import pytuya  # noqa: E402 pylint: disable=wrong-import-position
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+DEFAULT_TOLERANCE = 0.25
+# Allocation differences below this many bytes are considered noise
+ALLOC_SLACK = 64
+
+MIN_TIME = 0.02
+REPEAT = 21
+
+DEV_ID = "01234567891234567890"
+LOCAL_KEY = "0123456789abcdef"
+SET_DPS = {"1": True, "2": 128, "3": "colour", "4": "ff00000000ffff"}
+STATUS = {"devId": DEV_ID, "dps": {"1": True, "2": 128, "3": "colour", "20": 2315}}
+
+
+def calibrate():
+    """Return reference workloads by name, used to normalize throughput."""
+
+    def python():
+        data = {str(i): i for i in range(20)}
+        return sum(len(key) + value for key, value in data.items())
+
+    encryptor = Cipher(
+        algorithms.AES(LOCAL_KEY.encode()), modes.ECB(), default_backend()
+    ).encryptor()
+    block = json.dumps(STATUS).encode()[:64]
+
+    def aes():
+        return encryptor.update(block)
+
+    return {"python": python, "aes": aes}
+
+
+def reference_for(name):
+    """Return name of the reference workload for a benchmark."""
+    return "aes" if name.startswith("aes_") else "python"
+
+
+def device_message(interface, dev_type, data):
+    """Return a payload as it would be sent by the device."""
+    payload = json.dumps(data).encode()
+    if interface.version == 3.3:
+        payload = interface.cipher.encrypt(payload, False)
+        if dev_type != "type_0a":
+            payload = pytuya.PROTOCOL_33_HEADER + payload
+    return payload
+
+
+def make_interface(version, dev_type):
+    """Create an interface that is never connected."""
+    interface = pytuya.TuyaInterface(DEV_ID, "127.0.0.1", LOCAL_KEY, version)
+    interface.dev_type = dev_type
+    return interface
+
+
+def benchmarks():
+    """Return a dict with name and function of all benchmarks."""
+    cipher = pytuya.AESCipher(LOCAL_KEY.encode())
+    raw = json.dumps(STATUS).encode()
+    encrypted = cipher.encrypt(raw, False)
+    message = pytuya.TuyaMessage(1, 0x0A, 0, encrypted, 0)
+    # Messages from devices carry a return code in front of the payload
+    received = pytuya.pack_message(
+        pytuya.TuyaMessage(1, 0x0A, 0, b"\x00" * 4 + encrypted, 0)
+    )
+    stream = received * 4
+
+    cases = {
+        "pack_message": lambda: pytuya.pack_message(message),
+        "unpack_message": lambda: pytuya.unpack_message(received),
+        "decoder_feed_4_messages": lambda: pytuya.MessageDecoder().feed(stream),
+        "aes_encrypt": lambda: cipher.encrypt(raw, False),
+        "aes_decrypt": lambda: cipher.decrypt(encrypted, False),
+        "aes_encrypt_base64": lambda: cipher.encrypt(raw),
+    }
+
+    for version in (3.1, 3.3):
+        for dev_type in ("type_0a", "type_0d"):
+            interface = make_interface(version, dev_type)
+            name = f"{version}_{dev_type}"
+            cases[f"generate_status_{name}"] = (
+                lambda i=interface: i._generate_payload(pytuya.STATUS)
+            )
+            cases[f"generate_set_{name}"] = (
+                lambda i=interface: i._generate_payload(pytuya.SET, SET_DPS)
+            )
+            payload = device_message(interface, dev_type, STATUS)
+            cases[f"decode_{name}"] = (
+                lambda i=interface, p=payload: i._decode_payload(p)
+            )
+
+    return cases
+
+
+def loops_for(func):
+    """Return number of calls needed to run for at least MIN_TIME."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= MIN_TIME:
+            return number
+        number *= 2
+
+
+def time_calls(func, number):
+    """Return time needed for calling func number times."""
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+def measure_ops(func, reference):
+    """Return operations per second of func and its ratio to the reference.
+
+    Both are timed in turns, so that load changes affect them alike, and the
+    median of the turns is taken.
+    """
+    number = loops_for(func)
+    reference_number = loops_for(reference)
+    ops = []
+    ratios = []
+    for _ in range(REPEAT):
+        reference_ops = reference_number / time_calls(reference, reference_number)
+        ops.append(number / time_calls(func, number))
+        ratios.append(ops[-1] / reference_ops)
+    return statistics.median(ops), statistics.median(ratios)
+
+
+def measure_alloc(func, calls=20):
+    """Return average peak of bytes allocated by a call."""
+    func()  # warm up caches
+    total = 0
+    for _ in range(calls):
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        total += peak
+    return total // calls
+
+
+def run(selected=None):
+    """Run benchmarks and return results by name."""
+    references = calibrate()
+    results = {}
+    for name, func in benchmarks().items():
+        if selected and selected not in name:
+            continue
+        ops, relative = measure_ops(func, references[reference_for(name)])
+        results[name] = {
+            "ops": round(ops, 1),
+            "relative": round(relative, 4),
+            "alloc": measure_alloc(func),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print comparison with baseline and return list of regressions."""
+    regressions = []
+
+    print(f"{'benchmark':<32} {'ops/s':>12} {'expected':>12} {'bytes':>8} {'base':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32} {result['ops']:>12.0f} {'-':>12} {result['alloc']:>8}")
+            continue
+
+        expected = result["ops"] * base["relative"] / result["relative"]
+        marks = ""
+        if result["relative"] < base["relative"] * (1 - tolerance):
+            marks += " SLOWER"
+        if result["alloc"] > base["alloc"] * (1 + tolerance) + ALLOC_SLACK:
+            marks += " MORE ALLOCATIONS"
+        if marks:
+            regressions.append(name)
+        print(
+            f"{name:<32} {result['ops']:>12.0f} {expected:>12.0f} "
+            f"{result['alloc']:>8} {base['alloc']:>8}{marks}"
+        )
+    return regressions
+
+
+def main():
+    """Run benchmarks and compare with or update the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="store results as baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="allowed relative regression (default: %(default)s)",
+    )
+    parser.add_argument("--filter", help="only run benchmarks containing this")
+    args = parser.parse_args()
+
+    results = run(args.filter)
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Stored {len(results)} results in {BASELINE_FILE}")
+        return 0
+
+    with open(BASELINE_FILE) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
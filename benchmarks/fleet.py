@@ -0,0 +1,311 @@
+"""Fleet-scale load test with simulated devices.
+
+Starts N simulated devices (see pytuya.simulator) in a separate process and
+drives them from this process, reporting:
+
+ * poll cycle time: time for one update of every device
+ * p50/p99 command latency: time for a set_dps to complete
+ * peak threads, peak open sockets and peak RSS of the driving process
+
+Two models can be compared:
+
+ * device: TuyaDevice, as used by the integration (async_update per poll)
+ * executor: a blocking pytuya.TuyaInterface per device, called through the
+   executor with a new socket per exchange
+
+    python benchmarks/fleet.py --devices 100 500 1000 --mode device executor
+
+Requires Home Assistant to be installed. Each simulated device listens on its
+own loopback address (127.0.x.y), which works out of the box on Linux.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from homeassistant.const import (  # noqa: E402
+    CONF_DEVICE_ID,
+    CONF_ENTITIES,
+    CONF_FRIENDLY_NAME,
+    CONF_HOST,
+    CONF_ID,
+    CONF_PLATFORM,
+)
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.localtuya import common, pytuya  # noqa: E402
+from custom_components.localtuya.const import (  # noqa: E402
+    CONF_LOCAL_KEY,
+    CONF_PROTOCOL_VERSION,
+)
+from custom_components.localtuya.pytuya.simulator import (  # noqa: E402
+    SimulatedDevice,
+)
+
+LOCAL_KEY = "0123456789abcdef"
+DPS = {"1": True, "2": 0, "18": 120, "19": 540, "20": 2301}
+
+SAMPLE_INTERVAL = 0.01
+
+
+def device_id(index):
+    """Return device id of simulated device."""
+    return f"sim{index:017d}"
+
+
+def device_address(index):
+    """Return loopback address of simulated device."""
+    return f"127.0.{index // 250}.{index % 250 + 1}"
+
+
+def raise_fd_limit():
+    """Allow as many open sockets as permitted."""
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def run_simulators(count, latency, ready, stop):
+    """Run simulated devices until stop is set."""
+    raise_fd_limit()
+
+    async def _run():
+        devices = [
+            SimulatedDevice(
+                device_id(index),
+                LOCAL_KEY,
+                dps=DPS,
+                latency=latency,
+                host=device_address(index),
+            )
+            for index in range(count)
+        ]
+        await asyncio.gather(*(device.start() for device in devices))
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        await asyncio.gather(*(device.stop() for device in devices))
+
+    asyncio.get_event_loop().run_until_complete(_run())
+
+
+def open_sockets():
+    """Return number of sockets opened by this process."""
+    fd_dir = "/proc/self/fd"
+    count = 0
+    for name in os.listdir(fd_dir):
+        try:
+            if os.readlink(os.path.join(fd_dir, name)).startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+class ResourceMonitor:
+    """Sample thread and socket usage in the background."""
+
+    def __init__(self):
+        """Initialize a new ResourceMonitor."""
+        self.peak_threads = 0
+        self.peak_sockets = 0
+        self._task = None
+
+    def start(self):
+        """Start sampling."""
+        self._task = asyncio.ensure_future(self._sample())
+
+    def stop(self):
+        """Stop sampling."""
+        self._task.cancel()
+
+    async def _sample(self):
+        while True:
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_sockets = max(self.peak_sockets, open_sockets())
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+def percentile(values, fraction):
+    """Return percentile of values."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def timed(coro):
+    """Return seconds it took to complete coro."""
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+class DeviceModel:
+    """Drive devices through TuyaDevice, like the integration does."""
+
+    def __init__(self, hass, count):
+        """Initialize a new DeviceModel."""
+        self.devices = [
+            common.TuyaDevice(
+                hass,
+                {
+                    CONF_DEVICE_ID: device_id(index),
+                    CONF_HOST: device_address(index),
+                    CONF_LOCAL_KEY: LOCAL_KEY,
+                    CONF_PROTOCOL_VERSION: "3.3",
+                    CONF_FRIENDLY_NAME: f"Device {index}",
+                    CONF_ENTITIES: [
+                        {CONF_ID: 1, CONF_PLATFORM: "switch", CONF_FRIENDLY_NAME: "s"}
+                    ],
+                },
+            )
+            for index in range(count)
+        ]
+
+    async def setup(self):
+        """Connect to all devices."""
+        await asyncio.gather(*(device.async_connect() for device in self.devices))
+
+    def polls(self):
+        """Return one poll per device."""
+        return [device.async_update() for device in self.devices]
+
+    def commands(self, value):
+        """Return one command per device."""
+        return [device.set_dps(value, 2) for device in self.devices]
+
+    def close(self):
+        """Close all devices."""
+        for device in self.devices:
+            device.close()
+
+
+class ExecutorModel:
+    """Drive devices with blocking exchanges in the executor."""
+
+    def __init__(self, hass, count):
+        """Initialize a new ExecutorModel."""
+        self.hass = hass
+        self.interfaces = [
+            pytuya.TuyaInterface(
+                device_id(index), device_address(index), LOCAL_KEY, 3.3
+            )
+            for index in range(count)
+        ]
+
+    async def setup(self):
+        """Nothing to set up, every exchange connects."""
+
+    def polls(self):
+        """Return one poll per device."""
+        return [
+            self.hass.async_add_executor_job(interface.status)
+            for interface in self.interfaces
+        ]
+
+    def commands(self, value):
+        """Return one command per device."""
+        return [
+            self.hass.async_add_executor_job(interface.set_dps, value, 2)
+            for interface in self.interfaces
+        ]
+
+    def close(self):
+        """Nothing to close."""
+
+
+MODELS = {"device": DeviceModel, "executor": ExecutorModel}
+
+
+async def run_fleet(mode, count, cycles):
+    """Run poll cycles and commands against count devices."""
+    hass = HomeAssistant()
+    model = MODELS[mode](hass, count)
+    monitor = ResourceMonitor()
+    monitor.start()
+    await model.setup()
+
+    cycle_times = []
+    for _ in range(cycles):
+        cycle_times.append(await timed(asyncio.gather(*model.polls())))
+
+    latencies = []
+    for cycle in range(cycles):
+        latencies += await asyncio.gather(
+            *(timed(command) for command in model.commands(cycle))
+        )
+
+    model.close()
+    monitor.stop()
+    return {
+        "cycle": statistics.median(cycle_times),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "threads": monitor.peak_threads,
+        "sockets": monitor.peak_sockets,
+        "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024,
+    }
+
+
+def run(mode, count, cycles, latency, results):
+    """Run simulators and a fleet, and put the result in the results queue."""
+    ready = multiprocessing.Event()
+    stop = multiprocessing.Event()
+    simulators = multiprocessing.Process(
+        target=run_simulators, args=(count, latency, ready, stop)
+    )
+    simulators.start()
+    try:
+        ready.wait()
+        results.put(
+            asyncio.get_event_loop().run_until_complete(
+                run_fleet(mode, count, cycles)
+            )
+        )
+    finally:
+        stop.set()
+        simulators.join()
+
+
+def main():
+    """Run load tests and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[100])
+    parser.add_argument("--mode", choices=list(MODELS), nargs="+", default=list(MODELS))
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="response delay of devices"
+    )
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    print(
+        f"{'mode':<10} {'devices':>7} {'cycle s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'threads':>7} {'sockets':>7} {'RSS MiB':>7}"
+    )
+    for count in args.devices:
+        for mode in args.mode:
+            # RSS is a process-wide peak, so every run gets its own process
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=run, args=(mode, count, args.cycles, args.latency, results)
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            print(
+                f"{mode:<10} {count:>7} {result['cycle']:>8.2f} "
+                f"{result['p50'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f} "
+                f"{result['threads']:>7} {result['sockets']:>7} {result['rss']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
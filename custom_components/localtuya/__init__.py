@@ -9,6 +9,11 @@ localtuya:
     local_key: xxxxx
     friendly_name: Tuya Device
     protocol_version: "3.3"
+    write_delay: 0.05 # Optional, seconds to wait for more changes before sending
+    min_poll_interval: 10 # Optional, seconds between polls of busy devices
+    max_poll_interval: 300 # Optional, seconds between polls of idle devices
+    fresh_ttl: 30 # Optional, seconds before cached status is refreshed
+    max_stale: 900 # Optional, seconds before cached status is unknown
     entities:
       - platform: binary_sensor
         friendly_name: Plug Status
@@ -50,29 +55,26 @@ localtuya:
 """
 import asyncio
 import logging
-from datetime import timedelta, datetime
 
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.const import (
-    CONF_DEVICE_ID,
     CONF_PLATFORM,
     CONF_ENTITIES,
+    EVENT_HOMEASSISTANT_STOP,
 )
-from homeassistant.helpers.event import async_track_time_interval
-from homeassistant.helpers.dispatcher import async_dispatcher_send
 
-from .const import DOMAIN, TUYA_DEVICE
+from .const import DOMAIN, POLL_SCHEDULER, RECONNECT_COORDINATOR, TUYA_DEVICE
 from .config_flow import config_schema
 from .common import TuyaDevice
+from .profiles import async_get_profiles
+from .scheduler import PollScheduler, ReconnectCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
 UNSUB_LISTENER = "unsub_listener"
 UNSUB_TRACK = "unsub_track"
 
-POLL_INTERVAL = 30
-
 CONFIG_SCHEMA = config_schema()
 
 
@@ -80,6 +82,24 @@ async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the LocalTuya integration component."""
     hass.data.setdefault(DOMAIN, {})
 
+    @callback
+    def close_devices(_event):
+        """Close connections to all devices."""
+        for entry_data in hass.data[DOMAIN].values():
+            entry_data[TUYA_DEVICE].close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, close_devices)
+
+    scheduler = PollScheduler(hass)
+    hass.data[POLL_SCHEDULER] = scheduler
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, scheduler.async_stop)
+
+    reconnects = ReconnectCoordinator(hass)
+    hass.data[RECONNECT_COORDINATOR] = reconnects
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, reconnects.async_stop)
+
+    await async_get_profiles(hass)
+
     for host_config in config.get(DOMAIN, []):
         hass.async_create_task(
             hass.config_entries.flow.async_init(
@@ -94,23 +114,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up LocalTuya integration from a config entry."""
     unsub_listener = entry.add_update_listener(update_listener)
 
-    device = TuyaDevice(hass, entry.data)
-
-    async def update_state(now):
-        """Read device status and update platforms."""
-        status = None
-        try:
-            status = await hass.async_add_executor_job(device.status)
-        except Exception:
-            _LOGGER.debug("update failed")
-
-        signal = f"localtuya_{entry.data[CONF_DEVICE_ID]}"
-        async_dispatcher_send(hass, signal, status)
-
-    unsub_track = async_track_time_interval(
-        hass, update_state, timedelta(seconds=POLL_INTERVAL)
+    device = TuyaDevice(
+        hass,
+        entry.data,
+        hass.data[RECONNECT_COORDINATOR],
+        await async_get_profiles(hass),
     )
 
+    unsub_track = device.async_start_polling(hass.data[POLL_SCHEDULER])
+
     hass.data[DOMAIN][entry.entry_id] = {
         UNSUB_LISTENER: unsub_listener,
         UNSUB_TRACK: unsub_track,
@@ -127,7 +139,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             ]
         )
 
-        await update_state(datetime.now())
+        await device.async_connect()
 
     hass.async_create_task(setup_entities())
 
@@ -149,6 +161,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     hass.data[DOMAIN][entry.entry_id][UNSUB_LISTENER]()
     hass.data[DOMAIN][entry.entry_id][UNSUB_TRACK]()
+    hass.data[DOMAIN][entry.entry_id][TUYA_DEVICE].close()
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
 
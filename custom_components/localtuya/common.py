@@ -1,9 +1,11 @@
 """Code shared between all platforms."""
+import asyncio
 import logging
-from time import time, sleep
-from threading import (Lock, current_thread)
+from time import time
 
+from homeassistant.core import callback
 from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.dispatcher import (
     async_dispatcher_connect,
     async_dispatcher_send,
@@ -19,171 +21,537 @@ from homeassistant.const import (
 )
 
 from . import pytuya
-from .const import CONF_LOCAL_KEY, CONF_PROTOCOL_VERSION, DOMAIN, TUYA_DEVICE
+from .const import (
+    CONF_LOCAL_KEY,
+    CONF_PROTOCOL_VERSION,
+    CONF_WRITE_DELAY,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_FRESH_TTL,
+    CONF_MAX_STALE,
+    DEFAULT_WRITE_DELAY,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_FRESH_TTL,
+    DEFAULT_MAX_STALE,
+    DOMAIN,
+    TUYA_DEVICE,
+)
+from .profiles import PROFILE_DEV_TYPE, PROFILE_PROTOCOL_VERSION
+from .retry import CircuitBreaker, CircuitOpenError, RetryPolicy
 
 _LOGGER = logging.getLogger(__name__)
 
-REFRESH_SECS = 600
+# Delay before trying to re-establish a lost connection
+RECONNECT_INTERVAL = 10
+
+# Connection states of a device. Degraded devices lost their connection or
+# failed a refresh, but their cached status is still served
+STATE_CONNECTED = "connected"
+STATE_DEGRADED = "degraded"
+STATE_OFFLINE = "offline"
+
+# Seconds after a command during which the device is polled at the minimum
+# interval, to pick up its effects quickly
+COMMAND_FAST_POLL_TIME = 30
+
+# Seconds after a command during which the device is reconnected ahead of
+# others after an outage
+COMMAND_RECONNECT_PRIORITY_TIME = 600
 
 
 def prepare_setup_entities(hass, config_entry, platform):
     """Prepare ro setup entities for a platform."""
-    entities_to_setup = [
-        entity
-        for entity in config_entry.data[CONF_ENTITIES]
-        if entity[CONF_PLATFORM] == platform
-    ]
+    tuyainterface = hass.data[DOMAIN][config_entry.entry_id][TUYA_DEVICE]
+    entities_to_setup = tuyainterface.platform_entities(platform)
     if not entities_to_setup:
         return None, None
 
-    tuyainterface = hass.data[DOMAIN][config_entry.entry_id][TUYA_DEVICE]
-
     return tuyainterface, entities_to_setup
 
 
-def get_entity_config(config_entry, dps_id):
-    """Return entity config for a given DPS id."""
-    for entity in config_entry.data[CONF_ENTITIES]:
-        if entity[CONF_ID] == dps_id:
-            return entity
-    raise Exception(f"missing entity config for id {dps_id}")
-
+class TuyaDevice(pytuya.TuyaListener):
+    """Cache wrapper for pytuya.AsyncTuyaInterface.
 
-class TuyaDevice:
-    """Cache wrapper for pytuya.TuyaInterface."""
+    The cached status is served without waiting for the device. Once it is
+    older than the fresh TTL it is refreshed in the background, and once it
+    is older than the max stale TTL it is no longer served.
+    """
 
-    def __init__(self, hass, config_entry):
+    def __init__(self, hass, config_entry, reconnects=None, profiles=None):
         """Initialize the cache."""
-        self._cached_status = {"dps": {config_entry[CONF_DEVICE_ID]: True}}
-        # self._cached_status = ""
-        self._cached_status_time = 0
-        # Set the cache as populated so that we don't block the main thread when initialising
-        self._cached_status_time = time()
-        self._interface = pytuya.TuyaInterface(
+        self._cached_status = {"dps": {}}
+        # Time of the last full status read, None until the first one
+        self._cached_status_time = None
+        self._fresh_ttl = config_entry.get(CONF_FRESH_TTL, DEFAULT_FRESH_TTL)
+        self._max_stale = max(
+            self._fresh_ttl, config_entry.get(CONF_MAX_STALE, DEFAULT_MAX_STALE)
+        )
+        self._refresh_task = None
+        self._refreshing_dps = False
+        self._retry = RetryPolicy()
+        self._breaker = CircuitBreaker()
+        self.connection_state = STATE_OFFLINE
+        # DP values last sent to entities, None while unavailable
+        self._dispatched_dps = None
+        self._interface = pytuya.AsyncTuyaInterface(
             config_entry[CONF_DEVICE_ID],
             config_entry[CONF_HOST],
             config_entry[CONF_LOCAL_KEY],
             float(config_entry[CONF_PROTOCOL_VERSION]),
+            listener=self,
         )
+        self._protocol_version = config_entry[CONF_PROTOCOL_VERSION]
+        self._profiles = profiles
+        profile = profiles.get(config_entry[CONF_DEVICE_ID]) if profiles else None
+        if (
+            profile is not None
+            and profile[PROFILE_PROTOCOL_VERSION] == self._protocol_version
+        ):
+            # Start with the learned device type instead of relearning it
+            self._interface.dev_type = profile[PROFILE_DEV_TYPE]
+        # Entity configs by id and by platform
+        self._entity_configs = {}
+        self._platform_entities = {}
+        # Dispatcher signal of each entity, and ids of entities using each DP
+        self._entity_signals = {}
+        self._dps_entities = {}
         for entity in config_entry[CONF_ENTITIES]:
+            entity_id = entity[CONF_ID]
+            self._entity_configs[entity_id] = entity
+            self._platform_entities.setdefault(entity[CONF_PLATFORM], []).append(entity)
+            self._entity_signals[
+                entity_id
+            ] = f"localtuya_{config_entry[CONF_DEVICE_ID]}_{entity_id}"
             # this has to be done in case the device type is type_0d
-            self._interface.add_dps_to_request(entity[CONF_ID])
+            self._interface.add_dps_to_request(entity_id)
         self._friendly_name = config_entry[CONF_FRIENDLY_NAME]
         self._hass = hass
-        self._lock = Lock()
+        self._reconnects = reconnects
+        self._unsub_reconnect = None
+        self._closed = False
+        self._write_delay = config_entry.get(CONF_WRITE_DELAY, DEFAULT_WRITE_DELAY)
+        self._write_lock = asyncio.Lock()
+        self._write_done = None
+        self._pending_writes = {}
+        self._min_poll_interval = config_entry.get(
+            CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL
+        )
+        self._max_poll_interval = max(
+            self._min_poll_interval,
+            config_entry.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
+        )
+        self.poll_interval = self._max_poll_interval
+        self._scheduler = None
+        self._last_command = 0
+        self._last_change = time()
+        self._change_interval = self._max_poll_interval
 
     @property
     def unique_id(self):
         """Return unique device identifier."""
         return self._interface.id
 
-    def __get_status(self):
-        _LOGGER.debug("running def __get_status from TuyaDevice")
-        for i in range(5):
-            try:
-                status = self._interface.status()
-                return status
-            except Exception as e:
-                # print(
-                #     "Failed to update status of device [{}]: [{}]".format(
-                #         self._interface.address, e
-                #     )
-                # )
-                sleep(1.0)
-                if i + 1 == 3:
-                    _LOGGER.error(
-                        "Failed to update status of device %s", self._interface.address
-                    )
-                    return None
-                    # raise ConnectionError("Failed to update status .")
-        return None
-        # return {"dps": {}}
-        # return {"dps": self._cached_status["dps"]}
+    @property
+    def available(self):
+        """Return if the status of the device is known."""
+        return self.connection_state != STATE_OFFLINE
+
+    def _set_connection_state(self, state):
+        """Change connection state, making entities unavailable when offline."""
+        if state == self.connection_state:
+            return
+        _LOGGER.debug(
+            "Device %s is now %s, was %s",
+            self._interface.address,
+            state,
+            self.connection_state,
+        )
+        self.connection_state = state
+        if state == STATE_OFFLINE:
+            self._dispatch_status(None)
+
+    def platform_entities(self, platform):
+        """Return configs of the entities of a platform."""
+        return self._platform_entities.get(platform, [])
+
+    def entity_config(self, entity_id):
+        """Return config of an entity."""
+        try:
+            return self._entity_configs[entity_id]
+        except KeyError:
+            raise Exception(f"missing entity config for id {entity_id}") from None
+
+    def entity_signal(self, entity_id):
+        """Return dispatcher signal for status updates of an entity."""
+        return self._entity_signals[entity_id]
+
+    def async_register_entity(self, entity_id, used_dps):
+        """Send status updates of used_dps to an entity, returns undo function."""
+        for index in used_dps:
+            self._dps_entities.setdefault(index, set()).add(entity_id)
+
+        def unregister():
+            for index in used_dps:
+                self._dps_entities[index].discard(entity_id)
+
+        return unregister
+
+    async def async_connect(self, _now=None):
+        """Connect to the device and start receiving pushed status updates."""
+        self._unsub_reconnect = None
+        try:
+            await self._async_call(self._interface.connect)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.debug("Failed to connect to %s: %s", self._interface.address, ex)
+            self._schedule_reconnect()
+            self._set_connection_state(STATE_OFFLINE)
+            return
+
+        # Updates may have been missed while disconnected, so do a full refresh
+        await self.async_refresh()
+
+    def close(self):
+        """Close the connection to the device."""
+        self._closed = True
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._unsub_reconnect is not None:
+            self._unsub_reconnect()
+            self._unsub_reconnect = None
+        self._interface.close()
+
+    def _schedule_reconnect(self):
+        """Try to connect again after a while."""
+        if self._closed or self._unsub_reconnect is not None:
+            return
+        delay = max(RECONNECT_INTERVAL, self._breaker.retry_in)
+        if self._reconnects is None:
+            self._unsub_reconnect = async_call_later(
+                self._hass, delay, self.async_connect
+            )
+            return
+        priority = time() - self._last_command < COMMAND_RECONNECT_PRIORITY_TIME
+        self._unsub_reconnect = self._reconnects.async_schedule(
+            self.unique_id, self.async_connect, delay, priority
+        )
 
-    def set_dps(self, state, dps_index):
-        """Change value of a DP of the Tuya device and update the cached status."""
-        # _LOGGER.info("running def set_dps from TuyaDevice")
-        # No need to clear the cache here: let's just update the status of the
-        # changed dps as returned by the interface (see 5 lines below)
-        # self._cached_status = ""
-        # self._cached_status_time = 0
-        for i in range(5):
-            try:
-                result = self._interface.set_dps(state, dps_index)
-                self._cached_status["dps"].update(result["dps"])
-                signal = f"localtuya_{self._interface.id}"
-                async_dispatcher_send(self._hass, signal, self._cached_status)
-                return
-            except Exception as e:
-                print(
-                    "Failed to set status of device [{}]: [{}]".format(
-                        self._interface.address, e
-                    )
+    async def _async_call(self, func, *args):
+        """Run a device operation, retrying it unless the device keeps failing.
+
+        While the circuit breaker is open, raises CircuitOpenError right away.
+        Once it is half-open a single attempt is made as probe.
+        """
+        probe = self._breaker.state != CircuitBreaker.CLOSED
+        if not self._breaker.allow_request():
+            raise CircuitOpenError(
+                f"{self._interface.address} is unreachable, "
+                f"next attempt in {self._breaker.retry_in:.0f} s"
+            )
+        try:
+            if probe:
+                result = await func(*args)
+            else:
+                result = await self._retry.run(func, *args)
+        except asyncio.CancelledError:
+            # Says nothing about the device, but frees the probe slot
+            self._breaker.record_cancelled()
+            raise
+        except Exception:
+            self._breaker.record_failure()
+            if not probe and self._breaker.state != CircuitBreaker.CLOSED:
+                _LOGGER.warning(
+                    "Device %s keeps failing, not trying again for %d seconds",
+                    self._interface.address,
+                    self._breaker.reset_timeout,
                 )
-                if i + 1 == 3:
-                    _LOGGER.error(
-                        "Failed to set status of device %s", self._interface.address
-                    )
-                    return
+            raise
+        if probe:
+            _LOGGER.info("Device %s is reachable again", self._interface.address)
+        self._breaker.record_success()
+        if self._unsub_reconnect is not None and self._interface.is_connected:
+            # Reconnected by this operation, e.g. a command
+            self._unsub_reconnect()
+            self._unsub_reconnect = None
+        return result
+
+    def async_start_polling(self, scheduler):
+        """Poll the device with scheduler, returns a function to stop polling."""
+        self._scheduler = scheduler
+        return scheduler.async_add(
+            self.unique_id, self.async_update, self.poll_interval
+        )
+
+    async def async_update(self):
+        """Read device status and update platforms."""
+        await self.async_refresh()
+        self._adapt_poll_interval()
+
+    def _track_changes(self, dps):
+        """Note if a poll found changes, to adapt the poll interval.
+
+        Pushed updates are already in the cache, so only changes the device
+        did not push count: those are what polling is for.
+        """
+        cached = self._cached_status["dps"]
+        if all(cached.get(index) == value for index, value in dps.items()):
+            return
+        now = time()
+        # Moving average of the time between changes
+        self._change_interval = (self._change_interval + now - self._last_change) / 2
+        self._last_change = now
+        self._adapt_poll_interval()
+
+    def _adapt_poll_interval(self):
+        """Poll often after commands and while values change, rarely when idle."""
+        now = time()
+        if now - self._last_command < COMMAND_FAST_POLL_TIME:
+            interval = self._min_poll_interval
+        else:
+            # Back off while nothing changes for longer than usual
+            interval = max(self._change_interval, now - self._last_change)
+        interval = min(max(interval, self._min_poll_interval), self._max_poll_interval)
+        if interval != self.poll_interval:
+            _LOGGER.debug(
+                "Poll interval of %s is now %.0f s", self._interface.address, interval
+            )
+            self.poll_interval = interval
+            if self._scheduler is not None:
+                self._scheduler.async_set_interval(self.unique_id, interval)
+
+    def _dispatch_status(self, status):
+        """Send status to the entities using DPs that changed.
+
+        All entities are updated when the device becomes available or
+        unavailable, otherwise only those using a DP changed since the
+        previous status.
+        """
+        entities = self._entity_signals
+        if status is None:
+            self._dispatched_dps = None
+        else:
+            dps = status["dps"]
+            if self._dispatched_dps is not None:
+                previous = self._dispatched_dps
+                entities = set()
+                for index, value in dps.items():
+                    if index not in previous or previous[index] != value:
+                        entities.update(self._dps_entities.get(index, ()))
+            self._dispatched_dps = dict(dps)
+        for entity_id in entities:
+            async_dispatcher_send(self._hass, self._entity_signals[entity_id], status)
+
+    def status_updated(self, status):
+        """Device pushed a status update on its own."""
+        _LOGGER.debug("Status update from %s: %s", self._interface.address, status)
+        self._cached_status["dps"].update(status.get("dps", {}))
+        self._set_connection_state(STATE_CONNECTED)
+        self._dispatch_status(self._cached_status)
+
+    def disconnected(self):
+        """Handle loss of the connection to the device."""
+        _LOGGER.debug("Disconnected from %s", self._interface.address)
+        # Keep serving the cached status, unless reconnecting fails
+        if self.connection_state == STATE_CONNECTED:
+            self._set_connection_state(STATE_DEGRADED)
+        self._schedule_reconnect()
+
+    async def __get_status(self):
+        """Read status from the device, returns None if that fails."""
+        try:
+            return await self._async_call(self._interface.status)
+        except asyncio.CancelledError:
+            raise
+        except CircuitOpenError as ex:
+            _LOGGER.debug("Not updating status: %s", ex)
+            return None
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.error(
+                "Failed to update status of device %s: %r", self._interface.address, ex
+            )
+            return None
 
-    #                    raise ConnectionError("Failed to set status.")
+    async def async_refresh_dps(self, dps_indexes):
+        """Read only some DPs from the device and update platforms using them.
 
-    def set_dps_set(self, dps):
+        Skipped while another refresh is in progress, as callers poll for
+        changes anyway, and like full refreshes once the device is closed or
+        while a reconnect is pending.
+        """
+        if (
+            self._refresh_task is not None
+            or self._refreshing_dps
+            or self._closed
+            or self._unsub_reconnect is not None
+        ):
+            return
+        request = {str(index): None for index in dps_indexes}
+        self._refreshing_dps = True
+        try:
+            status = await self._async_call(
+                self._interface.exchange, pytuya.STATUS, request
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.debug(
+                "Failed to refresh DPs of %s: %s", self._interface.address, ex
+            )
+            return
+        finally:
+            self._refreshing_dps = False
+        if status is not None and "dps" in status:
+            self._track_changes(status["dps"])
+            self._cached_status["dps"].update(status["dps"])
+            self._dispatch_status(self._cached_status)
+
+    async def set_dps(self, state, dps_index):
         """Change value of a DP of the Tuya device and update the cached status."""
-        # _LOGGER.info("running def set_dps from TuyaDevice")
-        # No need to clear the cache here: let's just update the status of the
-        # changed dps as returned by the interface (see 5 lines below)
-        # self._cached_status = ""
-        # self._cached_status_time = 0
-        for i in range(5):
+        await self.set_dps_set({dps_index: state})
+
+    async def set_dps_set(self, dps):
+        """Change values of several DPs of the Tuya device.
+
+        Changes requested within the write delay, by any entity of the device, are
+        sent together in a single message. A newer value for a DP replaces one
+        that has not been sent yet.
+        """
+        self._pending_writes.update({str(index): value for index, value in dps.items()})
+        self._last_command = time()
+        self._adapt_poll_interval()
+        if self._write_done is None:
+            self._write_done = self._hass.loop.create_future()
+            self._hass.async_create_task(self._async_write_pending())
+        await asyncio.shield(self._write_done)
+
+    async def _async_write_pending(self):
+        """Send all pending DP changes after the write delay."""
+        await asyncio.sleep(self._write_delay)
+        # Only one write at a time, so that an older value being retried can
+        # never land after a newer one
+        async with self._write_lock:
+            dps, self._pending_writes = self._pending_writes, {}
+            done, self._write_done = self._write_done, None
             try:
-                result = self._interface.exchange('set', dps)
-                self._cached_status["dps"].update(result["dps"])
-                signal = f"localtuya_{self._interface.id}"
-                async_dispatcher_send(self._hass, signal, self._cached_status)
-                return
-            except Exception as e:
-                print(
-                    "Failed to set status of device [{}]: [{}]".format(
-                        self._interface.address, e
-                    )
-                )
-                if i + 1 == 3:
-                    _LOGGER.error(
-                        "Failed to set status of device %s", self._interface.address
-                    )
-                    return
+                await self.__set_dps(dps)
+            finally:
+                done.set_result(None)
+
+    async def __set_dps(self, dps):
+        """Change value of DPs of the Tuya device and update the cached status."""
+
+        async def _send():
+            # Values replaced by newer pending changes are not worth retrying
+            for index in self._pending_writes:
+                dps.pop(index, None)
+            if not dps:
+                return None
+            return await self._interface.exchange(pytuya.SET, dps)
+
+        try:
+            result = await self._async_call(_send)
+        except asyncio.CancelledError:
+            raise
+        except CircuitOpenError as ex:
+            _LOGGER.warning("Failed to set status of device: %s", ex)
+            return
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.error(
+                "Failed to set status of device %s: %r", self._interface.address, ex
+            )
+            return
+        if not dps:
+            return
+
+        # No need to clear the cache here: let's just update the status of the
+        # changed dps as returned by the interface. Devices may only acknowledge
+        # the change and push the resulting status separately, in which case the
+        # new values are assumed
+        if result is None:
+            result = {"dps": dps}
+        self._cached_status["dps"].update(result["dps"])
+        self._dispatch_status(self._cached_status)
 
-    #                    raise ConnectionError("Failed to set status.")
+    @property
+    def status_age(self):
+        """Return seconds since the status was last read, None if never."""
+        if self._cached_status_time is None:
+            return None
+        return time() - self._cached_status_time
 
     def status(self):
-        """Get the state of the Tuya device and cache the results."""
-        if current_thread().name == "MainThread":
-            _LOGGER.debug(
-                "skipping def status(self) from TuyaDevice on MainThread")
-        else:
-            now = time()
-            if not self._cached_status or now - self._cached_status_time >= REFRESH_SECS:
-                _LOGGER.debug("running def status(self) from TuyaDevice")
-                self._cached_status_time = time()
-                self._lock.acquire()
-                try:
-                    sleep(0.5)
-                    _LOGGER.debug("Starting periodic update of cached status")
-                    # Set cache as updated now so that we don't keep spamming ourselves on other threads
-                    self._cached_status_time = now
-                    self._cached_status = self.__get_status()
-                    if self._cached_status is None:
-                        self._cached_status = {"dps": {}}
-
-                    # self._cached_status_time = time()
-                finally:
-                    self._lock.release()
-            else:
-                _LOGGER.debug(
-                    "skipping periodic def status(self) from TuyaDevice")
+        """Return cached status of the device, None if unknown or too old.
+
+        Never waits for the device: a stale status is still returned while it
+        is refreshed in the background.
+        """
+        age = self.status_age
+        if age is None or age >= self._fresh_ttl:
+            if not self._closed:
+                self._start_refresh()
+        return self._servable_status()
+
+    def _servable_status(self):
+        """Return cached status unless it is unknown or too old."""
+        age = self.status_age
+        if age is None or age >= self._max_stale:
+            return None
         return self._cached_status
 
+    async def async_refresh(self):
+        """Read status from the device, cache it and update platforms.
+
+        Concurrent callers share a single read of the device.
+        """
+        refresh = self._start_refresh()
+        if refresh is not None:
+            await asyncio.shield(refresh)
+        elif self._servable_status() is None:
+            self._set_connection_state(STATE_OFFLINE)
+
+    def _start_refresh(self):
+        """Return the refresh in progress, starting one if there is none.
+
+        Returns None once the device is closed, and while a reconnect is
+        pending: reconnects are spread by the reconnect coordinator, so
+        refreshes must not reconnect on their own.
+        """
+        if self._closed or self._unsub_reconnect is not None:
+            return None
+        if self._refresh_task is None:
+            self._refresh_task = self._hass.async_create_task(self._async_refresh())
+        return self._refresh_task
+
+    async def _async_refresh(self):
+        try:
+            _LOGGER.debug("Refreshing status of %s", self._interface.address)
+            status = await self.__get_status()
+            if status is not None:
+                self._track_changes(status["dps"])
+                self._cached_status = status
+                self._cached_status_time = time()
+                if self._profiles is not None:
+                    self._profiles.async_observe(
+                        self._interface.id,
+                        self._protocol_version,
+                        self._interface.dev_type,
+                        status["dps"],
+                    )
+        finally:
+            self._refresh_task = None
+        if status is not None:
+            self._set_connection_state(STATE_CONNECTED)
+        elif (
+            self._breaker.state == CircuitBreaker.CLOSED
+            and self._servable_status() is not None
+        ):
+            self._set_connection_state(STATE_DEGRADED)
+        else:
+            self._set_connection_state(STATE_OFFLINE)
+        if self.available:
+            self._dispatch_status(self._servable_status())
+
 
 class LocalTuyaEntity(Entity):
     """Representation of a Tuya entity."""
@@ -192,14 +560,18 @@ class LocalTuyaEntity(Entity):
         """Initialize the Tuya entity."""
         self._device = device
         self._config_entry = config_entry
-        self._config = get_entity_config(config_entry, dps_id)
+        self._config = device.entity_config(dps_id)
         self._dps_id = dps_id
         self._status = {}
+        # Status keys of the DPS indexes passed to dps()
+        self._dps_keys = {}
+        self._written_state = None
 
     async def async_added_to_hass(self):
         """Subscribe localtuya events."""
         await super().async_added_to_hass()
 
+        @callback
         def _update_handler(status):
             """Update entity state when status was updated."""
             if status is not None:
@@ -208,12 +580,42 @@ class LocalTuyaEntity(Entity):
             else:
                 self._status = {}
 
-            self.schedule_update_ha_state()
+            self.async_write_changed_state()
 
-        signal = f"localtuya_{self._config_entry.data[CONF_DEVICE_ID]}"
+        signal = self._device.entity_signal(self._dps_id)
         self.async_on_remove(
             async_dispatcher_connect(self.hass, signal, _update_handler)
         )
+        self.async_on_remove(
+            self._device.async_register_entity(self._dps_id, self.used_dps())
+        )
+
+        # The device may have dispatched its status before this entity was added
+        status = self._device.status()
+        if status is not None:
+            _update_handler(status)
+
+    def _state_snapshot(self):
+        """Return everything written to the state machine that may change."""
+        return (
+            self.available,
+            self.state,
+            self.state_attributes,
+            self.device_state_attributes,
+        )
+
+    @callback
+    def async_write_ha_state(self):
+        """Write the state to the state machine."""
+        self._written_state = self._state_snapshot()
+        super().async_write_ha_state()
+
+    @callback
+    def async_write_changed_state(self):
+        """Write the state to the state machine if it changed."""
+        # Identical writes would only add churn to the state machine
+        if self._state_snapshot() != self._written_state:
+            self.async_write_ha_state()
 
     @property
     def device_info(self):
@@ -252,14 +654,17 @@ class LocalTuyaEntity(Entity):
     @property
     def available(self):
         """Return if device is available or not."""
-        return bool(self._status)
+        return self._device.available and bool(self._status)
 
     def dps(self, dps_index):
         """Return cached value for DPS index."""
         if "dps" not in self._status:
             return None
 
-        value = self._status["dps"].get(str(dps_index))
+        key = self._dps_keys.get(dps_index)
+        if key is None:
+            key = self._dps_keys[dps_index] = str(dps_index)
+        value = self._status["dps"].get(key)
         if value is None:
             _LOGGER.warning(
                 "Entity %s is requesting unknown DPS index %s",
@@ -269,6 +674,13 @@ class LocalTuyaEntity(Entity):
 
         return value
 
+    def used_dps(self):
+        """Return ids of the DPs that the state of the entity depends on.
+
+        Override in subclasses reading other DPs than their own.
+        """
+        return {str(self._dps_id)}
+
     def status_updated(self):
         """Device status was updated.
 
@@ -1,4 +1,5 @@
 """Config flow for LocalTuya integration integration."""
+import asyncio
 import logging
 from importlib import import_module
 
@@ -21,10 +22,26 @@ from .const import (  # pylint: disable=unused-import
     CONF_LOCAL_KEY,
     CONF_PROTOCOL_VERSION,
     CONF_DPS_STRINGS,
+    CONF_WRITE_DELAY,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_FRESH_TTL,
+    CONF_MAX_STALE,
+    DEFAULT_WRITE_DELAY,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_FRESH_TTL,
+    DEFAULT_MAX_STALE,
     DOMAIN,
     PLATFORMS,
 )
 from .discovery import discover
+from .profiles import (
+    PROFILE_DEV_TYPE,
+    PROFILE_DPS,
+    PROFILE_PROTOCOL_VERSION,
+    async_get_profiles,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -62,6 +79,21 @@ DEVICE_SCHEMA = vol.Schema(
         vol.Required(CONF_LOCAL_KEY): cv.string,
         vol.Required(CONF_FRIENDLY_NAME): cv.string,
         vol.Required(CONF_PROTOCOL_VERSION, default="3.3"): vol.In(["3.1", "3.3"]),
+        vol.Optional(CONF_WRITE_DELAY, default=DEFAULT_WRITE_DELAY): vol.All(
+            vol.Coerce(float), vol.Range(min=0.0, max=5.0)
+        ),
+        vol.Optional(
+            CONF_MIN_POLL_INTERVAL, default=DEFAULT_MIN_POLL_INTERVAL
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(
+            CONF_MAX_POLL_INTERVAL, default=DEFAULT_MAX_POLL_INTERVAL
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_FRESH_TTL, default=DEFAULT_FRESH_TTL): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_MAX_STALE, default=DEFAULT_MAX_STALE): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
     }
 )
 
@@ -157,25 +189,59 @@ def config_schema():
     )
 
 
-async def validate_input(hass: core.HomeAssistant, data):
+async def read_known_dps(tuyainterface, profile):
+    """Return status of the DPs in a profile, or None if that fails."""
+    tuyainterface.dev_type = profile[PROFILE_DEV_TYPE]
+    try:
+        data = await tuyainterface.exchange(
+            pytuya.STATUS, {index: None for index in profile[PROFILE_DPS]}
+        )
+        return data["dps"]
+    except (OSError, asyncio.TimeoutError):
+        raise
+    except Exception as ex:  # pylint: disable=broad-except
+        _LOGGER.debug("Reading DPs known from profile failed: %s", ex)
+        return None
+
+
+async def validate_input(hass: core.HomeAssistant, data, product_key=None):
     """Validate the user input allows us to connect."""
-    tuyainterface = pytuya.TuyaInterface(
+    tuyainterface = pytuya.AsyncTuyaInterface(
         data[CONF_DEVICE_ID],
         data[CONF_HOST],
         data[CONF_LOCAL_KEY],
         float(data[CONF_PROTOCOL_VERSION]),
+        heartbeat_interval=0,
     )
-    detected_dps = {}
+    profiles = await async_get_profiles(hass)
+    profile = profiles.get(data[CONF_DEVICE_ID]) or profiles.get_product(product_key)
+    detected_dps = None
 
     try:
-        detected_dps = await hass.async_add_executor_job(
-            tuyainterface.detect_available_dps
-        )
-    except (ConnectionRefusedError, ConnectionResetError):
+        # Devices of a known model only need a single status request
+        if (
+            profile is not None
+            and profile[PROFILE_PROTOCOL_VERSION] == data[CONF_PROTOCOL_VERSION]
+        ):
+            detected_dps = await read_known_dps(tuyainterface, profile)
+        if not detected_dps:
+            tuyainterface.dev_type = "type_0a"
+            detected_dps = await tuyainterface.detect_available_dps()
+    except (OSError, asyncio.TimeoutError):
         raise CannotConnect
     except ValueError:
         raise InvalidAuth
-
+    finally:
+        tuyainterface.close()
+
+    if detected_dps:
+        profiles.async_observe(
+            data[CONF_DEVICE_ID],
+            data[CONF_PROTOCOL_VERSION],
+            tuyainterface.dev_type,
+            detected_dps,
+            product_key,
+        )
     return dps_string_list(detected_dps)
 
 
@@ -232,7 +298,12 @@ class LocaltuyaConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             try:
                 self.basic_info = user_input
-                self.dps_strings = await validate_input(self.hass, user_input)
+                product_key = None
+                if self.selected_device is not None:
+                    product_key = self.devices[self.selected_device].get("productKey")
+                self.dps_strings = await validate_input(
+                    self.hass, user_input, product_key
+                )
                 return await self.async_step_pick_entity_type()
             except CannotConnect:
                 errors["base"] = "cannot_connect"
@@ -7,6 +7,25 @@ ATTR_VOLTAGE = "voltage"
 CONF_LOCAL_KEY = "local_key"
 CONF_PROTOCOL_VERSION = "protocol_version"
 CONF_DPS_STRINGS = "dps_strings"
+CONF_WRITE_DELAY = "write_delay"
+CONF_MIN_POLL_INTERVAL = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL = "max_poll_interval"
+CONF_FRESH_TTL = "fresh_ttl"
+CONF_MAX_STALE = "max_stale"
+
+# Seconds to wait for more DP changes before sending them together
+DEFAULT_WRITE_DELAY = 0.05
+
+# Bounds of the poll interval in seconds. Devices push state changes over the
+# persistent connection, so polling is only a fallback for missed updates and
+# is done more often only for devices whose changes are often not pushed
+DEFAULT_MIN_POLL_INTERVAL = 10
+DEFAULT_MAX_POLL_INTERVAL = 300
+
+# Seconds a status read from the device is served without refreshing it, and
+# after which it is considered unknown
+DEFAULT_FRESH_TTL = 30
+DEFAULT_MAX_STALE = 900
 
 # switch
 CONF_CURRENT = "current"
@@ -34,3 +53,7 @@ DOMAIN = "localtuya"
 PLATFORMS = ["binary_sensor", "cover", "fan", "light", "sensor", "switch"]
 
 TUYA_DEVICE = "tuya_device"
+
+POLL_SCHEDULER = f"{DOMAIN}_poll_scheduler"
+RECONNECT_COORDINATOR = f"{DOMAIN}_reconnect_coordinator"
+DEVICE_PROFILES = f"{DOMAIN}_device_profiles"
@@ -1,12 +1,15 @@
 """Platform to locally control Tuya-based cover devices."""
 import logging
-from time import sleep
+from collections import deque
+from datetime import timedelta
+from time import monotonic
 
 import voluptuous as vol
 
 from homeassistant.components.cover import (
     CoverEntity,
     DOMAIN,
+    ATTR_CURRENT_POSITION,
     SUPPORT_CLOSE,
     SUPPORT_OPEN,
     SUPPORT_STOP,
@@ -14,6 +17,8 @@ from homeassistant.components.cover import (
     ATTR_POSITION,
 )
 from homeassistant.const import CONF_ID
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import (
     CONF_OPENCLOSE_CMDS,
@@ -37,6 +42,18 @@ DEFAULT_OPENCLOSE_CMDS = COVER_ONOFF_CMDS
 DEFAULT_POSITIONING_MODE = COVER_MODE_NONE
 DEFAULT_SPAN_TIME = 25.0
 
+# Seconds between updates of the estimated position of moving covers
+FAKE_POSITION_UPDATE_INTERVAL = timedelta(seconds=1)
+
+# While a cover in position mode moves, its estimated position is published
+# every tick and its position DP is read at most every sample interval
+MOTION_TICK = timedelta(seconds=0.5)
+MOTION_SAMPLE_INTERVAL = 1.0
+# Seconds without position change after which a cover is considered stopped,
+# and seconds after which tracking gives up in any case
+MOTION_STOPPED_TIME = 2.5
+MOTION_MAX_TIME = 300
+
 
 def flow_schema(dps):
     """Return schema used in config flow."""
@@ -76,7 +93,81 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     async_add_entities(covers)
 
 
-class LocaltuyaCover(LocalTuyaEntity, CoverEntity):
+class CoverTravel:
+    """Estimate position of a cover from the time it has been moving."""
+
+    def __init__(self, span_time, position=0.0):
+        """Initialize a new CoverTravel."""
+        self._span_time = span_time
+        self._position = position
+        # 1 when opening, -1 when closing, 0 when stopped
+        self.direction = 0
+        self._started = None
+
+    @property
+    def position(self):
+        """Return estimated position in percent."""
+        if not self.direction:
+            return self._position
+        moved = (monotonic() - self._started) / self._span_time * 100
+        return min(100.0, max(0.0, self._position + self.direction * moved))
+
+    def start(self, direction):
+        """Start moving in direction from the current position."""
+        self._position = self.position
+        self.direction = direction
+        self._started = monotonic()
+
+    def stop(self, position=None):
+        """Stop moving, at position if known."""
+        self._position = self.position if position is None else position
+        self.direction = 0
+
+    def time_to(self, position):
+        """Return seconds needed to move to position."""
+        return abs(position - self.position) / 100 * self._span_time
+
+
+class PositionSamples:
+    """Interpolate position of a moving cover between reported positions."""
+
+    def __init__(self):
+        """Initialize a new PositionSamples."""
+        self._samples = deque(maxlen=2)
+        self.last_change = None
+
+    def add(self, position):
+        """Add a reported position."""
+        if position is None:
+            return
+        now = monotonic()
+        if not self._samples or self._samples[-1][1] != position:
+            self._samples.append((now, position))
+            self.last_change = now
+
+    def reset(self):
+        """Forget the speed of the previous movement."""
+        while len(self._samples) > 1:
+            self._samples.popleft()
+        self.last_change = monotonic()
+
+    @property
+    def position(self):
+        """Return estimated current position."""
+        if not self._samples:
+            return None
+        last_time, last_position = self._samples[-1]
+        if len(self._samples) < 2:
+            return last_position
+        first_time, first_position = self._samples[0]
+        # Extrapolate at the last speed, by no more than one sample interval
+        interval = last_time - first_time
+        elapsed = min(monotonic() - last_time, interval)
+        estimate = last_position + (last_position - first_position) * elapsed / interval
+        return min(100, max(0, round(estimate)))
+
+
+class LocaltuyaCover(LocalTuyaEntity, CoverEntity, RestoreEntity):
     """Tuya cover device."""
 
     def __init__(
@@ -92,8 +183,32 @@ class LocaltuyaCover(LocalTuyaEntity, CoverEntity):
         self._current_cover_position = None
         self._open_cmd = self._config[CONF_OPENCLOSE_CMDS].split("_")[0]
         self._close_cmd = self._config[CONF_OPENCLOSE_CMDS].split("_")[1]
+        self._fake = self._config[CONF_POSITIONING_MODE] == COVER_MODE_FAKE
+        self._travel = CoverTravel(self._config[CONF_SPAN_TIME])
+        self._unsub_travel_done = None
+        self._unsub_position_updates = None
+        self._target_position = None
+        self._samples = PositionSamples()
+        self._unsub_motion = None
+        self._motion_started = None
+        self._last_sample = 0
         print("Initialized cover [{}]".format(self.name))
 
+    async def async_added_to_hass(self):
+        """Restore estimated position of fake positioning covers."""
+        await super().async_added_to_hass()
+        if not self._fake:
+            return
+        last_state = await self.async_get_last_state()
+        if last_state is not None:
+            position = last_state.attributes.get(ATTR_CURRENT_POSITION)
+            if position is not None:
+                self._travel.stop(float(position))
+
+    async def async_will_remove_from_hass(self):
+        """Stop tracking movement."""
+        self._stop_tracking()
+
     @property
     def supported_features(self):
         """Flag supported features."""
@@ -105,82 +220,213 @@ class LocaltuyaCover(LocalTuyaEntity, CoverEntity):
     @property
     def current_cover_position(self):
         """Return current cover position in percent."""
+        if self._fake:
+            return round(self._travel.position)
+        if self._unsub_motion is not None:
+            return self._samples.position
         return self._current_cover_position
 
     @property
     def is_opening(self):
         """Return if cover is opening."""
+        if self._fake:
+            return self._travel.direction > 0
         state = self._state
         return state == self._open_cmd
 
     @property
     def is_closing(self):
         """Return if cover is closing."""
+        if self._fake:
+            return self._travel.direction < 0
         state = self._state
         return state == self._close_cmd
 
     @property
     def is_open(self):
         """Return if the cover is open or not."""
-        if self._config[CONF_POSITIONING_MODE] != COVER_MODE_POSITION:
+        if self._config[CONF_POSITIONING_MODE] == COVER_MODE_NONE:
             return None
-        return self._current_cover_position == 100
+        return self.current_cover_position == 100
 
     @property
     def is_closed(self):
         """Return if the cover is closed or not."""
-        if self._config[CONF_POSITIONING_MODE] != COVER_MODE_POSITION:
+        if self._config[CONF_POSITIONING_MODE] == COVER_MODE_NONE:
             return None
-        return self._current_cover_position == 0
+        return self.current_cover_position == 0
 
-    def set_cover_position(self, **kwargs):
+    async def async_set_cover_position(self, **kwargs):
         """Move the cover to a specific position."""
         _LOGGER.debug("Setting cover position: %r", kwargs[ATTR_POSITION])
-        if self._config[CONF_POSITIONING_MODE] == COVER_MODE_FAKE:
-            newpos = float(kwargs[ATTR_POSITION])
-
-            currpos = self.current_cover_position
-            posdiff = abs(newpos - currpos)
-            mydelay = posdiff / 50.0 * self._config[CONF_SPAN_TIME]
-            if newpos > currpos:
-                _LOGGER.debug("Opening to %f: delay %f", newpos, mydelay)
-                self.open_cover()
-            else:
-                _LOGGER.debug("Closing to %f: delay %f", newpos, mydelay)
-                self.close_cover()
-            sleep(mydelay)
-            self.stop_cover()
-            self._current_cover_position = 50
-            _LOGGER.debug("Done")
+        if self._fake:
+            await self._async_travel_to(float(kwargs[ATTR_POSITION]))
 
         elif self._config[CONF_POSITIONING_MODE] == COVER_MODE_POSITION:
             converted_position = int(kwargs[ATTR_POSITION])
             if 0 <= converted_position <= 100 and self.has_config(CONF_SET_POSITION_DP):
-                self._device.set_dps(
+                await self._device.set_dps(
                     converted_position, self._config[CONF_SET_POSITION_DP]
                 )
+                self._start_motion_tracking()
 
-    def open_cover(self, **kwargs):
+    async def async_open_cover(self, **kwargs):
         """Open the cover."""
+        if self._fake:
+            await self._async_travel_to(100.0)
+            return
         _LOGGER.debug("Launching command %s to cover ", self._open_cmd)
-        self._device.set_dps(self._open_cmd, self._dps_id)
+        await self._device.set_dps(self._open_cmd, self._dps_id)
 
-    def close_cover(self, **kwargs):
+    async def async_close_cover(self, **kwargs):
         """Close cover."""
+        if self._fake:
+            await self._async_travel_to(0.0)
+            return
         _LOGGER.debug("Launching command %s to cover ", self._close_cmd)
-        self._device.set_dps(self._close_cmd, self._dps_id)
+        await self._device.set_dps(self._close_cmd, self._dps_id)
 
-    def stop_cover(self, **kwargs):
+    async def async_stop_cover(self, **kwargs):
         """Stop the cover."""
+        if self._fake:
+            self._stop_tracking()
+            self._travel.stop()
+            self.async_write_ha_state()
+        elif self._unsub_motion is not None:
+            self._stop_tracking()
+            self.async_write_ha_state()
         _LOGGER.debug("Launching command %s to cover ", COVER_STOP_CMD)
-        self._device.set_dps(COVER_STOP_CMD, self._dps_id)
+        await self._device.set_dps(COVER_STOP_CMD, self._dps_id)
+
+    async def _async_travel_to(self, position):
+        """Move a fake positioning cover and stop it once at position.
+
+        A cover already moving is retargeted, and only reverses if needed.
+        Commands to fully open or close are always sent, as the estimate may
+        have drifted from the actual position.
+        """
+        current = self._travel.position
+        end_position = position in (0, 100)
+        if position == current:
+            if end_position:
+                # Covers stop by themselves when fully opened or closed, so
+                # the estimate is in sync again once the command is sent
+                self._stop_tracking()
+                self._travel.stop(position)
+                self.async_write_changed_state()
+                await self._async_move(1 if position else -1)
+            elif self._travel.direction:
+                await self.async_stop_cover()
+            return
+        direction = 1 if position > current else -1
+        _LOGGER.debug("Moving cover from %.0f to %.0f", current, position)
+
+        if self._unsub_travel_done is not None:
+            self._unsub_travel_done()
+        self._unsub_travel_done = async_call_later(
+            self.hass, self._travel.time_to(position), self._async_travel_done
+        )
+        self._target_position = position
+        if self._unsub_position_updates is None:
+            self._unsub_position_updates = async_track_time_interval(
+                self.hass, self._async_position_update, FAKE_POSITION_UPDATE_INTERVAL
+            )
+
+        if direction != self._travel.direction:
+            self._travel.start(direction)
+            self.async_write_ha_state()
+        elif not end_position:
+            return
+        await self._async_move(direction)
+
+    async def _async_move(self, direction):
+        """Send the command to open or close the cover."""
+        command = self._open_cmd if direction > 0 else self._close_cmd
+        _LOGGER.debug("Launching command %s to cover ", command)
+        await self._device.set_dps(command, self._dps_id)
+
+    async def _async_travel_done(self, _now):
+        """Cover reached its target position."""
+        self._unsub_travel_done = None
+        self._stop_tracking()
+        position = self._target_position
+        self._travel.stop(position)
+        self.async_write_ha_state()
+        # Covers stop by themselves when fully opened or closed
+        if 0 < position < 100:
+            _LOGGER.debug("Launching command %s to cover ", COVER_STOP_CMD)
+            await self._device.set_dps(COVER_STOP_CMD, self._dps_id)
+
+    async def _async_position_update(self, _now):
+        """Publish estimated position while moving."""
+        self.async_write_changed_state()
+
+    def _start_motion_tracking(self):
+        """Follow position of a moving cover closely until it stops."""
+        if self._unsub_motion is not None or not self.has_config(
+            CONF_CURRENT_POSITION_DP
+        ):
+            return
+        _LOGGER.debug("Tracking motion of %s", self.entity_id)
+        self._motion_started = monotonic()
+        self._samples.reset()
+        self._unsub_motion = async_track_time_interval(
+            self.hass, self._async_motion_tick, MOTION_TICK
+        )
+
+    async def _async_motion_tick(self, _now):
+        """Publish estimated position and read the position DP of the cover."""
+        now = monotonic()
+        if (
+            now - self._samples.last_change >= MOTION_STOPPED_TIME
+            or now - self._motion_started >= MOTION_MAX_TIME
+        ):
+            _LOGGER.debug("Cover %s stopped moving", self.entity_id)
+            self._stop_tracking()
+            self.async_write_changed_state()
+            return
+
+        self.async_write_changed_state()
+        if now - self._last_sample >= MOTION_SAMPLE_INTERVAL:
+            self._last_sample = now
+            await self._device.async_refresh_dps(
+                [self._config[CONF_CURRENT_POSITION_DP]]
+            )
+
+    def _stop_tracking(self):
+        """Cancel timers of a moving cover."""
+        if self._unsub_motion is not None:
+            self._unsub_motion()
+            self._unsub_motion = None
+        if self._unsub_travel_done is not None:
+            self._unsub_travel_done()
+            self._unsub_travel_done = None
+        if self._unsub_position_updates is not None:
+            self._unsub_position_updates()
+            self._unsub_position_updates = None
+
+    def used_dps(self):
+        """Return ids of the DPs that the state of the entity depends on."""
+        used = super().used_dps()
+        if self.has_config(CONF_CURRENT_POSITION_DP):
+            used.add(str(self._config[CONF_CURRENT_POSITION_DP]))
+        return used
 
     def status_updated(self):
         """Device status was updated."""
+        previous_state = self._state
         self._state = self.dps(self._dps_id)
         if self.has_config(CONF_CURRENT_POSITION_DP):
             self._current_cover_position = self.dps(
                 self._config[CONF_CURRENT_POSITION_DP]
             )
+            if self._config[CONF_POSITIONING_MODE] == COVER_MODE_POSITION:
+                self._samples.add(self._current_cover_position)
+                if self._state in (self._open_cmd, self._close_cmd):
+                    self._start_motion_tracking()
+                # The control DP keeps the last command, so only a stop
+                # reported while moving means the cover stopped
+                elif self._state == COVER_STOP_CMD and previous_state != COVER_STOP_CMD:
+                    self._stop_tracking()
         else:
             self._current_cover_position = 50
@@ -1,4 +1,5 @@
 """Platform to locally control Tuya-based fan devices."""
+import asyncio
 import logging
 
 from homeassistant.components.fan import (
@@ -81,43 +82,50 @@ class LocaltuyaFan(LocalTuyaEntity, FanEntity):
         """Get the list of available speeds."""
         return [SPEED_OFF, SPEED_LOW, SPEED_MEDIUM, SPEED_HIGH]
 
-    def turn_on(self, speed: str = None, **kwargs) -> None:
+    async def async_turn_on(self, speed: str = None, **kwargs) -> None:
         """Turn on the entity."""
-        self._device.set_dps(True, "1")
         if speed is not None:
-            self.set_speed(speed)
+            # Both changes are queued before awaiting, so they are sent together
+            await asyncio.gather(
+                self._device.set_dps(True, "1"), self.async_set_speed(speed)
+            )
         else:
-            self.schedule_update_ha_state()
+            await self._device.set_dps(True, "1")
+            self.async_write_ha_state()
 
-    def turn_off(self, **kwargs) -> None:
+    async def async_turn_off(self, **kwargs) -> None:
         """Turn off the entity."""
-        self._device.set_dps(False, "1")
-        self.schedule_update_ha_state()
+        await self._device.set_dps(False, "1")
+        self.async_write_ha_state()
 
-    def set_speed(self, speed: str) -> None:
+    async def async_set_speed(self, speed: str) -> None:
         """Set the speed of the fan."""
         self._speed = speed
         if speed == SPEED_OFF:
-            self._device.set_dps(False, "1")
+            await self._device.set_dps(False, "1")
         elif speed == SPEED_LOW:
-            self._device.set_dps("1", "2")
+            await self._device.set_dps("1", "2")
         elif speed == SPEED_MEDIUM:
-            self._device.set_dps("2", "2")
+            await self._device.set_dps("2", "2")
         elif speed == SPEED_HIGH:
-            self._device.set_dps("3", "2")
-        self.schedule_update_ha_state()
+            await self._device.set_dps("3", "2")
+        self.async_write_ha_state()
 
-    def oscillate(self, oscillating: bool) -> None:
+    async def async_oscillate(self, oscillating: bool) -> None:
         """Set oscillation."""
         self._oscillating = oscillating
-        self._device.set_value("8", oscillating)
-        self.schedule_update_ha_state()
+        await self._device.set_dps(oscillating, "8")
+        self.async_write_ha_state()
 
     @property
     def supported_features(self) -> int:
         """Flag supported features."""
         return SUPPORT_SET_SPEED | SUPPORT_OSCILLATE
 
+    def used_dps(self):
+        """Return ids of the DPs that the state of the entity depends on."""
+        return {"1", "2", "8"}
+
     def status_updated(self):
         """Get state of Tuya fan."""
         self._is_on = self._status["dps"]["1"]
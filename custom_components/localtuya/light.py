@@ -146,18 +146,6 @@ class LocaltuyaLight(LocalTuyaEntity, LightEntity):
         else:
             return [0, 0]
 
-    @property
-    def should_poll(self):
-        """Return if platform should poll for updates."""
-        return True
-
-    @property
-    def available(self):
-        """Return if device is available or not."""
-        # Update if necessary
-        status = self._device.status()
-        return bool(self._status)
-
     @property
     def supported_features(self):
         """Flag supported features."""
@@ -168,7 +156,7 @@ class LocaltuyaLight(LocalTuyaEntity, LightEntity):
             supports = supports | SUPPORT_COLOR
         return supports
 
-    def turn_on(self, **kwargs):
+    async def async_turn_on(self, **kwargs):
         """Turn on or control the light."""
         dps = {}
 
@@ -235,11 +223,20 @@ class LocaltuyaLight(LocalTuyaEntity, LightEntity):
                         + ", hexvalue = " + hexvalue
                         + ", lightness = " + str(lightness))
 
-        self._device.set_dps_set(dps)
+        await self._device.set_dps_set(dps)
 
-    def turn_off(self, **kwargs):
+    async def async_turn_off(self, **kwargs):
         """Turn Tuya light off."""
-        self._device.set_dps(False, self._dps_id)
+        await self._device.set_dps(False, self._dps_id)
+
+    def used_dps(self):
+        """Return ids of the DPs that the state of the entity depends on."""
+        return super().used_dps() | {
+            DPS_INDEX_MODE,
+            DPS_INDEX_BRIGHTNESS,
+            DPS_INDEX_COLOURTEMP,
+            DPS_INDEX_COLOUR,
+        }
 
     def status_updated(self):
         """Device status was updated."""
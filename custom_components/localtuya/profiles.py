@@ -0,0 +1,106 @@
+"""Persisted capabilities of Tuya devices and products."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+
+from .const import DEVICE_PROFILES, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.profiles"
+STORAGE_VERSION = 1
+
+# Seconds to wait for more changes before writing profiles to disk
+SAVE_DELAY = 30
+
+PROFILE_PROTOCOL_VERSION = "protocol_version"
+PROFILE_DEV_TYPE = "dev_type"
+PROFILE_DPS = "dps"
+PROFILE_PRODUCT_KEY = "product_key"
+
+
+async def async_get_profiles(hass):
+    """Return the device profiles, loading them on first use.
+
+    Config flows can run before the integration was set up, so the profiles
+    are not loaded in async_setup only.
+    """
+    if DEVICE_PROFILES not in hass.data:
+        hass.data[DEVICE_PROFILES] = hass.async_create_task(_async_load(hass))
+    return await hass.data[DEVICE_PROFILES]
+
+
+async def _async_load(hass):
+    """Create and load the device profiles."""
+    profiles = DeviceProfiles(hass)
+    await profiles.async_load()
+    return profiles
+
+
+def dps_types(dps):
+    """Return type name of each DP value."""
+    return {index: type(value).__name__ for index, value in dps.items()}
+
+
+class DeviceProfiles:
+    """Capabilities learned from devices, kept across restarts.
+
+    A profile holds the protocol version, the device type (type_0a or
+    type_0d) and the DPs seen with the type of their values. Profiles are
+    kept per device id, and per product key (from discovery) so that other
+    devices of the same model can be set up without detection.
+    """
+
+    def __init__(self, hass):
+        """Initialize a new DeviceProfiles."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._devices = {}
+        self._products = {}
+
+    async def async_load(self):
+        """Load profiles from storage."""
+        data = await self._store.async_load() or {}
+        self._devices = data.get("devices", {})
+        self._products = data.get("products", {})
+
+    def get(self, dev_id):
+        """Return profile of a device, or None if it is unknown."""
+        return self._devices.get(dev_id)
+
+    def get_product(self, product_key):
+        """Return profile of a product, or None if it is unknown."""
+        if product_key is None:
+            return None
+        return self._products.get(product_key)
+
+    @callback
+    def async_observe(self, dev_id, protocol_version, dev_type, dps, product_key=None):
+        """Update profile of a device with a status read from it."""
+        current = self._devices.get(dev_id, {})
+        if product_key is None:
+            product_key = current.get(PROFILE_PRODUCT_KEY)
+        profile = {
+            PROFILE_PROTOCOL_VERSION: protocol_version,
+            PROFILE_DEV_TYPE: dev_type,
+            PROFILE_DPS: {**current.get(PROFILE_DPS, {}), **dps_types(dps)},
+        }
+        if product_key is not None:
+            profile[PROFILE_PRODUCT_KEY] = product_key
+        if profile == current:
+            return
+
+        _LOGGER.debug("Updated profile of %s: %s", dev_id, profile)
+        self._devices[dev_id] = profile
+        if product_key is not None:
+            self._products[product_key] = {
+                key: value
+                for key, value in profile.items()
+                if key != PROFILE_PRODUCT_KEY
+            }
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        """Return data to write to storage."""
+        return {"devices": self._devices, "products": self._products}
@@ -16,6 +16,9 @@ Classes
        dev_id (str): Device ID e.g. 01234567891234567890
        address (str): Device Network IP Address e.g. 10.0.1.99
        local_key (str, optional): The encryption key. Defaults to None.
+   AsyncTuyaInterface(dev_id, address, local_key=None)
+       Same as TuyaInterface, but keeps a persistent connection to the device
+       and exposes awaitable status() and set_dps().
 
 Functions
    json = status()          # returns json payload
@@ -36,6 +39,7 @@ Credits
    Updated pytuya to support devices with Device IDs of 22 characters
 """
 
+import asyncio
 import base64
 from hashlib import md5
 import json
@@ -61,6 +65,21 @@ TuyaMessage = namedtuple("TuyaMessage", "seqno cmd retcode payload crc")
 SET = "set"
 STATUS = "status"
 
+# Command used by devices to push status updates
+SET_COMMAND = 0x07
+STATUS_PUSH = 0x08
+HEART_BEAT = 0x09
+
+# Seconds between heartbeats, the interval is doubled (up to the max) every
+# HEARTBEAT_STABLE_COUNT answered heartbeats and reset when one is missed
+HEARTBEAT_INTERVAL = 10
+HEARTBEAT_MAX_INTERVAL = 40
+HEARTBEAT_STABLE_COUNT = 6
+# Seconds to wait for a heartbeat answer and number of missed heartbeats in a
+# row after which the device is considered offline
+HEARTBEAT_TIMEOUT = 3
+HEARTBEAT_MISSED_LIMIT = 3
+
 PROTOCOL_VERSION_BYTES_31 = b"3.1"
 PROTOCOL_VERSION_BYTES_33 = b"3.3"
 
@@ -69,10 +88,38 @@ PROTOCOL_33_HEADER = PROTOCOL_VERSION_BYTES_33 + 12 * b"\x00"
 MESSAGE_HEADER_FMT = ">4I"  # 4*uint32: prefix, seqno, cmd, length
 MESSAGE_RECV_HEADER_FMT = ">5I"  # 4*uint32: prefix, seqno, cmd, length, retcode
 MESSAGE_END_FMT = ">2I"  # 2*uint32: crc, suffix
+MESSAGE_RETCODE_FMT = ">I"  # uint32: retcode
+
+MESSAGE_HEADER = struct.Struct(MESSAGE_HEADER_FMT)
+MESSAGE_END = struct.Struct(MESSAGE_END_FMT)
+MESSAGE_RETCODE = struct.Struct(MESSAGE_RETCODE_FMT)
 
 PREFIX_VALUE = 0x000055AA
 SUFFIX_VALUE = 0x0000AA55
 
+PREFIX_BYTES = struct.pack(">I", PREFIX_VALUE)
+
+# Upper bound for the length field of a message, anything larger is treated as
+# garbage and skipped while looking for the next message
+MAX_MESSAGE_LEN = 0x10000
+
+RECV_BUFFER_SIZE = 4096
+
+# type_0d devices only report the DPs asked for. Experience shows that they
+# are usually in the ranges [1-25] and [100-110], which are asked for in parts
+# due to the request payload limitation (max. length = 255)
+DPS_DETECT_RANGES = [(2, 11), (11, 21), (21, 31), (100, 111)]
+
+# Seconds allowed for detecting the DPs of a device
+DPS_DETECT_BUDGET = 10
+
+
+def dps_detect_request(dps_range):
+    """Return DPs to ask for to detect the DPs in a range."""
+    # dps 1 must always be sent, otherwise it might fail in case no dps is found
+    # in the requested range
+    return {str(index): None for index in (1, *range(*dps_range))}
+
 
 # This is intended to match requests.json payload at
 # https://github.com/codetheweb/tuyapi :
@@ -114,53 +161,128 @@ def socketcontext(address, port, timeout):
         s.close()
 
 
+class DecodeError(Exception):
+    """Raised when data received from a device is not a valid message."""
+
+
 def pack_message(msg):
     """Pack a TuyaMessage into bytes."""
     # Create full message excluding CRC and suffix
     buffer = (
-        struct.pack(
-            MESSAGE_HEADER_FMT,
-            PREFIX_VALUE,
-            msg.seqno,
-            msg.cmd,
-            len(msg.payload) + struct.calcsize(MESSAGE_END_FMT),
+        MESSAGE_HEADER.pack(
+            PREFIX_VALUE, msg.seqno, msg.cmd, len(msg.payload) + MESSAGE_END.size
         )
         + msg.payload
     )
 
     # Calculate CRC, add it together with suffix
-    buffer += struct.pack(MESSAGE_END_FMT,
-                          binascii.crc32(buffer), SUFFIX_VALUE)
+    buffer += MESSAGE_END.pack(binascii.crc32(buffer), SUFFIX_VALUE)
 
     return buffer
 
 
 def unpack_message(data):
-    """Unpack bytes into a TuyaMessage."""
-    header_len = struct.calcsize(MESSAGE_RECV_HEADER_FMT)
-    end_len = struct.calcsize(MESSAGE_END_FMT)
+    """Unpack bytes holding a complete message into a TuyaMessage."""
+    messages = MessageDecoder().feed(data)
+    if not messages:
+        raise DecodeError(f"No valid message in data={data!r}")
+    return messages[0]
 
-    _, seqno, cmd, _, retcode = struct.unpack(
-        MESSAGE_RECV_HEADER_FMT, data[:header_len]
-    )
-    payload = data[header_len:-end_len]
-    crc, _ = struct.unpack(MESSAGE_END_FMT, data[-end_len:])
-    return TuyaMessage(seqno, cmd, retcode, payload, crc)
+
+class MessageDecoder:
+    """Incremental decoder turning a stream of bytes into TuyaMessages.
+
+    Data can be fed in chunks of any size: partial messages are buffered until
+    complete and several messages in one chunk are all returned. Messages with
+    a bad prefix, suffix or CRC are dropped and decoding resumes at the next
+    prefix found in the stream.
+    """
+
+    def __init__(self, has_retcode=True):
+        """Initialize a new MessageDecoder.
+
+        Args:
+            has_retcode (bool): Messages may carry a return code after the
+                header, which is the case for messages sent by devices. Not
+                all do, e.g. status pushes of many 3.3 devices, so it is
+                detected per message.
+        """
+        self._buffer = bytearray()
+        self._has_retcode = has_retcode
+
+    def feed(self, data):
+        """Add received data and return list of messages completed by it."""
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        pos = 0
+
+        with memoryview(buffer) as view:
+            while True:
+                start = buffer.find(PREFIX_BYTES, pos)
+                if start < 0:
+                    # Keep what might be the beginning of a split prefix
+                    pos = max(pos, len(buffer) - len(PREFIX_BYTES) + 1)
+                    break
+                if start != pos:
+                    _LOGGER.debug("Skipping %d bytes of garbage", start - pos)
+                pos = start
+
+                if len(buffer) - pos < MESSAGE_HEADER.size:
+                    break
+                _, seqno, cmd, length = MESSAGE_HEADER.unpack_from(buffer, pos)
+                if not MESSAGE_END.size <= length <= MAX_MESSAGE_LEN:
+                    _LOGGER.debug("Invalid message length %d, resyncing", length)
+                    pos += 1
+                    continue
+
+                end = pos + MESSAGE_HEADER.size + length
+                if len(buffer) < end:
+                    break
+
+                crc_pos = end - MESSAGE_END.size
+                crc, suffix = MESSAGE_END.unpack_from(buffer, crc_pos)
+                if suffix != SUFFIX_VALUE or crc != binascii.crc32(view[pos:crc_pos]):
+                    _LOGGER.debug("Invalid suffix or CRC in message, resyncing")
+                    pos += 1
+                    continue
+
+                retcode = 0
+                payload_pos = pos + MESSAGE_HEADER.size
+                if self._has_retcode and crc_pos - payload_pos >= MESSAGE_RETCODE.size:
+                    # Return codes are small, while payloads start with a
+                    # version header, JSON or encrypted data
+                    (value,) = MESSAGE_RETCODE.unpack_from(buffer, payload_pos)
+                    if value & 0xFFFFFF00 == 0:
+                        retcode = value
+                        payload_pos += MESSAGE_RETCODE.size
+                payload = bytes(view[payload_pos:crc_pos])
+                messages.append(TuyaMessage(seqno, cmd, retcode, payload, crc))
+                pos = end
+
+        del buffer[:pos]
+        return messages
 
 
 class AESCipher:
-    """Cipher module for Tuya communication."""
+    """Cipher module for Tuya communication.
+
+    Encryption and decryption contexts are created once and reused, which is
+    possible since ECB mode keeps no state between blocks. An instance must
+    therefore not be used from several threads at the same time.
+    """
 
     def __init__(self, key):
         """Initialize a new AESCipher."""
         self.bs = 16
         self.cipher = Cipher(algorithms.AES(
             key), modes.ECB(), default_backend())
+        self._encryptor = self.cipher.encryptor()
+        self._decryptor = self.cipher.decryptor()
 
     def encrypt(self, raw, use_base64=True):
         """Encrypt data to be sent to device."""
-        encryptor = self.cipher.encryptor()
-        crypted_text = encryptor.update(self._pad(raw)) + encryptor.finalize()
+        crypted_text = self._encryptor.update(self._pad(raw))
         return base64.b64encode(crypted_text) if use_base64 else crypted_text
 
     def decrypt(self, enc, use_base64=True):
@@ -168,8 +290,11 @@ class AESCipher:
         if use_base64:
             enc = base64.b64decode(enc)
 
-        decryptor = self.cipher.decryptor()
-        return self._unpad(decryptor.update(enc) + decryptor.finalize()).decode()
+        # A partial block would be kept by the shared context and garble the
+        # next message, so reject it up front
+        if len(enc) % self.bs:
+            raise ValueError("The length of the data is not a multiple of the block")
+        return self._unpad(self._decryptor.update(enc)).decode()
 
     def _pad(self, s):
         padnum = self.bs - len(s) % self.bs
@@ -180,14 +305,14 @@ class AESCipher:
         return s[: -ord(s[len(s) - 1:])]
 
 
-class TuyaInterface:
-    """Represent a Tuya device."""
+class BaseTuyaInterface:
+    """Common state and message encoding shared by Tuya interfaces."""
 
     def __init__(
         self, dev_id, address, local_key, protocol_version, connection_timeout=5
     ):
         """
-        Initialize a new TuyaInterface.
+        Initialize a new Tuya interface.
 
         Args:
             dev_id (str): The device id.
@@ -206,87 +331,11 @@ class TuyaInterface:
         self.dps_to_request = {}
         self.cipher = AESCipher(self.local_key)
         self.seqno = 0
+        self._templates = self._build_templates()
+        self._payload_cache = {}
 
         self.port = 6668  # default - do not expect caller to pass in
 
-    def exchange(self, command, dps=None):
-        """Send and receive a message, returning response from device."""
-        _LOGGER.debug("Sending command %s (device type: %s)",
-                      command, self.dev_type)
-        payload = self._generate_payload(command, dps)
-        dev_type = self.dev_type
-
-        with socketcontext(self.address, self.port, self.connection_timeout) as s:
-            s.send(payload)
-            data = s.recv(1024)
-
-            # sometimes the first packet does not contain data (typically 28 bytes):
-            # need to read again
-            if len(data) < 40:
-                time.sleep(0.1)
-                data = s.recv(1024)
-
-            msg = unpack_message(data)
-            # TODO: Verify stuff, e.g. CRC sequence number
-
-            payload = self._decode_payload(msg.payload)
-
-        # Perform a new exchange (once) if we switched device type
-        if dev_type != self.dev_type:
-            _LOGGER.debug(
-                "Re-send %s due to device type change (%s -> %s)",
-                command,
-                dev_type,
-                self.dev_type,
-            )
-            return self.exchange(command, dps)
-        return payload
-
-    def status(self):
-        """Return device status."""
-        try:
-            return self.exchange(STATUS)
-        except Exception as e:
-            self.dev_type = "type_0a"
-            raise
-
-    def set_dps(self, value, dps_index):
-        """
-        Set value (may be any type: bool, int or string) of any dps index.
-
-        Args:
-            dps_index(int):   dps index to set
-            value: new value for the dps index
-        """
-        return self.exchange(SET, {str(dps_index): value})
-
-    def detect_available_dps(self):
-        """Return which datapoints are supported by the device."""
-        # type_0d devices need a sort of bruteforce querying in order to detect the
-        # list of available dps experience shows that the dps available are usually
-        # in the ranges [1-25] and [100-110] need to split the bruteforcing in
-        # different steps due to request payload limitation (max. length = 255)
-        detected_dps = {}
-        ranges = [(2, 11), (11, 21), (21, 31), (100, 111)]
-
-        for dps_range in ranges:
-            # dps 1 must always be sent, otherwise it might fail in case no dps is found
-            # in the requested range
-            self.dps_to_request = {}
-            # self.dps_to_request = {"1": None}
-            # self.add_dps_to_request(range(*dps_range))
-            try:
-                data = self.status()
-                detected_dps.update(data["dps"])
-
-                if self.dev_type == "type_0a":
-                    return detected_dps
-            except Exception as e:
-                _LOGGER.warning("Failed to get status: %s", e)
-#                raise
-
-        return detected_dps
-
     def add_dps_to_request(self, dps_index):
         """Add a datapoint (DP) to be included in requests."""
         if isinstance(dps_index, int):
@@ -326,6 +375,22 @@ class TuyaInterface:
         _LOGGER.debug("decrypted result=%r", payload)
         return json.loads(payload)
 
+    def _build_templates(self):
+        """Pre-serialize the parts of the messages that never change."""
+        templates = {}
+        for dev_type, commands in PAYLOAD_DICT.items():
+            for command, cmd_data in commands.items():
+                fields = cmd_data["command"]
+                # uid is still the id, there is no separate uid
+                static = {key: self.id for key in fields if key != "t"}
+                prefix = json.dumps(static, separators=(",", ":"))[:-1].encode()
+                templates[dev_type, command] = (
+                    cmd_data["hexByte"],
+                    prefix,
+                    "t" in fields,
+                )
+        return templates
+
     def _generate_payload(self, command, data=None):
         """
         Generate the payload to send.
@@ -336,27 +401,37 @@ class TuyaInterface:
             data(dict, optional): The data to be send.
                 This is what will be passed via the 'dps' entry
         """
-        cmd_data = PAYLOAD_DICT[self.dev_type][command]
-        json_data = cmd_data["command"]
-        command_hb = cmd_data["hexByte"]
-
-        if "gwId" in json_data:
-            json_data["gwId"] = self.id
-        if "devId" in json_data:
-            json_data["devId"] = self.id
-        if "uid" in json_data:
-            json_data["uid"] = self.id  # still use id, no separate uid
-        if "t" in json_data:
-            json_data["t"] = str(int(time.time()))
-
-        if data is not None:
-            json_data["dps"] = data
+        key = (self.dev_type, command)
+        command_hb, prefix, has_timestamp = self._templates[key]
+
+        # Without timestamp and data the payload is the same every time, so it is
+        # only encoded and encrypted once
+        cacheable = data is None and not has_timestamp
+        payload = self._payload_cache.get(key) if cacheable else None
+        if payload is None:
+            payload = self._encode_payload(
+                command, command_hb, prefix, has_timestamp, data
+            )
+            if cacheable:
+                self._payload_cache[key] = payload
+
+        msg = TuyaMessage(self.seqno, command_hb, 0, payload, 0)
+        self.seqno += 1
+        return pack_message(msg)
+
+    def _encode_payload(self, command, command_hb, prefix, has_timestamp, data):
+        """Serialize and encrypt a payload according to the protocol version."""
+        parts = [prefix]
+        if has_timestamp:
+            parts += [b',"t":"', str(int(time.time())).encode(), b'"']
+        if data is None:
+            parts.append(b',"dps":{"schema":true}}')
         else:
-            json_data["dps"] = {"schema": True}
+            dps = json.dumps(data, separators=(",", ":")).encode()
+            parts += [b',"dps":', dps, b"}"]
         # if command_hb == 0x0D:
         #     json_data["dps"] = self.dps_to_request
-
-        payload = json.dumps(json_data).replace(" ", "").encode("utf-8")
+        payload = b"".join(parts)
         _LOGGER.debug("paylod=%r", payload)
 
         if self.version == 3.3:
@@ -382,11 +457,391 @@ class TuyaInterface:
                 + hexdigest[8:][:16].encode("latin1")
                 + payload
             )
-
-        msg = TuyaMessage(self.seqno, command_hb, 0, payload, 0)
-        self.seqno += 1
-        return pack_message(msg)
+        return payload
 
     def __repr__(self):
         """Return internal string representation of object."""
         return "%r" % ((self.id, self.address),)  # FIXME can do better than this
+
+
+class TuyaInterface(BaseTuyaInterface):
+    """Represent a Tuya device."""
+
+    def exchange(self, command, dps=None):
+        """Send and receive a message, returning response from device."""
+        _LOGGER.debug("Sending command %s (device type: %s)",
+                      command, self.dev_type)
+        payload = self._generate_payload(command, dps)
+        dev_type = self.dev_type
+
+        decoder = MessageDecoder()
+        with socketcontext(self.address, self.port, self.connection_timeout) as s:
+            s.send(payload)
+
+            # sometimes the first packet does not contain data (typically 28 bytes):
+            # keep reading until a message with payload arrives
+            msg = None
+            while msg is None:
+                data = s.recv(RECV_BUFFER_SIZE)
+                if not data:
+                    raise ConnectionResetError("Connection closed by device")
+                msg = next((m for m in decoder.feed(data) if m.payload), None)
+
+            payload = self._decode_payload(msg.payload)
+
+        # Perform a new exchange (once) if we switched device type
+        if dev_type != self.dev_type:
+            _LOGGER.debug(
+                "Re-send %s due to device type change (%s -> %s)",
+                command,
+                dev_type,
+                self.dev_type,
+            )
+            return self.exchange(command, dps)
+        return payload
+
+    def status(self):
+        """Return device status."""
+        try:
+            return self.exchange(STATUS)
+        except OSError:
+            # Not reaching the device says nothing about its type
+            raise
+        except Exception:
+            self.dev_type = "type_0a"
+            raise
+
+    def set_dps(self, value, dps_index):
+        """
+        Set value (may be any type: bool, int or string) of any dps index.
+
+        Args:
+            dps_index(int):   dps index to set
+            value: new value for the dps index
+        """
+        return self.exchange(SET, {str(dps_index): value})
+
+    def detect_available_dps(self):
+        """Return which datapoints are supported by the device."""
+        # Learns the device type, and gets all DPs of type_0a devices
+        data = self.status()
+        detected_dps = dict(data["dps"]) if data else {}
+        if self.dev_type == "type_0a":
+            return detected_dps
+
+        for dps_range in DPS_DETECT_RANGES:
+            try:
+                data = self.exchange(STATUS, dps_detect_request(dps_range))
+                detected_dps.update(data["dps"])
+            except Exception as e:
+                _LOGGER.warning("Failed to get status: %s", e)
+
+        return detected_dps
+
+
+class TuyaListener:
+    """Listener interface for events from an AsyncTuyaInterface."""
+
+    def status_updated(self, status):
+        """Device pushed a status update on its own."""
+
+    def disconnected(self):
+        """Handle loss of the connection to the device."""
+
+
+class AsyncTuyaInterface(BaseTuyaInterface):
+    """Represent a Tuya device reached over a persistent asyncio connection.
+
+    While connected, messages are read continuously: responses are matched to
+    pending requests by sequence number, so several requests can be in flight
+    at the same time, and status updates the device sends on its own (e.g.
+    when a button is pressed) are forwarded to the listener.
+    """
+
+    def __init__(
+        self,
+        dev_id,
+        address,
+        local_key,
+        protocol_version,
+        connection_timeout=5,
+        listener=None,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+    ):
+        """Initialize a new AsyncTuyaInterface.
+
+        Args:
+            listener (TuyaListener, optional): Receives pushed status updates.
+            heartbeat_interval (int, optional): Initial seconds between
+                heartbeats while connected. Set to 0 to disable heartbeats.
+        """
+        super().__init__(
+            dev_id, address, local_key, protocol_version, connection_timeout
+        )
+        self.listener = listener
+        self.heartbeat_interval = heartbeat_interval
+        self._writer = None
+        self._read_task = None
+        self._heartbeat_task = None
+        self._heartbeat_answered = asyncio.Event()
+        self._last_received = 0
+        self._pending = {}
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def is_connected(self):
+        """Return if there is an open connection to the device."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        """Connect to the device unless already connected.
+
+        Returns True if a new connection was opened.
+        """
+        if self.is_connected:
+            return False
+
+        async with self._connect_lock:
+            return await self._connect()
+
+    async def _connect(self):
+        if self.is_connected:
+            return False
+
+        reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.address, self.port),
+            self.connection_timeout,
+        )
+        self._read_task = asyncio.ensure_future(self._read_loop(reader, self._writer))
+        if self.heartbeat_interval:
+            self._heartbeat_task = asyncio.ensure_future(self._heartbeat_loop())
+        _LOGGER.debug("Connected to %s", self.address)
+        return True
+
+    def close(self):
+        """Close the connection to the device."""
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for _, future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionResetError("Connection closed"))
+
+    def _connection_lost(self, exc):
+        """Clean up after the connection was lost unexpectedly."""
+        if self._writer is None:
+            return
+        _LOGGER.debug("Connection to %s lost: %s", self.address, exc)
+        self._read_task = None
+        self.close()
+        if self.listener is not None:
+            self.listener.disconnected()
+
+    async def _read_loop(self, reader, writer):
+        """Read and dispatch messages until the connection is closed."""
+        decoder = MessageDecoder()
+        try:
+            while True:
+                data = await reader.read(RECV_BUFFER_SIZE)
+                if not data:
+                    raise ConnectionResetError("Connection closed by device")
+                for msg in decoder.feed(data):
+                    self._handle_message(msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:  # pylint: disable=broad-except
+            # Reading stops by itself once close() was called, which is not a loss
+            if writer is self._writer:
+                self._connection_lost(ex)
+
+    async def _heartbeat_loop(self):
+        """Send heartbeats and drop the connection if the device stops answering."""
+        loop = asyncio.get_event_loop()
+        interval = self.heartbeat_interval
+        answered = missed = 0
+        while True:
+            if not missed:
+                await asyncio.sleep(interval)
+                # Any message received proves the device is alive
+                if loop.time() - self._last_received < interval:
+                    continue
+
+            self._heartbeat_answered.clear()
+            self._writer.write(self._generate_heartbeat())
+            try:
+                await asyncio.wait_for(
+                    self._heartbeat_answered.wait(), HEARTBEAT_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                missed += 1
+                answered = 0
+                interval = self.heartbeat_interval
+                _LOGGER.debug("Missed heartbeat %d from %s", missed, self.address)
+                if missed >= HEARTBEAT_MISSED_LIMIT:
+                    self._heartbeat_task = None
+                    self._connection_lost(asyncio.TimeoutError("Missed heartbeats"))
+                    return
+                continue
+
+            missed = 0
+            answered += 1
+            if answered % HEARTBEAT_STABLE_COUNT == 0:
+                interval = min(interval * 2, HEARTBEAT_MAX_INTERVAL)
+
+    def _generate_heartbeat(self):
+        """Generate a heartbeat message."""
+        msg = TuyaMessage(self.seqno, HEART_BEAT, 0, b"", 0)
+        self.seqno += 1
+        return pack_message(msg)
+
+    def _handle_message(self, msg):
+        """Hand a message to the pending request or the listener."""
+        self._last_received = asyncio.get_event_loop().time()
+        if msg.cmd == HEART_BEAT:
+            self._heartbeat_answered.set()
+            return
+
+        seqno = msg.seqno
+        request = self._pending.get(seqno)
+        # Pushes are numbered by the device and may reuse a pending number
+        if request is None or request[0] != msg.cmd:
+            # Not all firmwares echo the sequence number, so fall back to the
+            # oldest request waiting for this command
+            seqno = next(
+                (key for key, req in self._pending.items() if req[0] == msg.cmd), None
+            )
+
+        # sometimes the first packet does not contain data (typically 28 bytes):
+        # the payload follows in the next one, except for SET which is answered
+        # by an acknowledgement only
+        if seqno is not None and (msg.payload or msg.cmd == SET_COMMAND):
+            _, future = self._pending.pop(seqno)
+            if not future.done():
+                future.set_result(msg)
+        elif msg.cmd == STATUS_PUSH and msg.payload and self.listener is not None:
+            try:
+                status = self._decode_payload(msg.payload)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.debug("Failed to decode status update: %r", msg.payload)
+                return
+            if status:
+                self.listener.status_updated(status)
+        else:
+            _LOGGER.debug("Dropping unexpected message: %r", msg)
+
+    async def exchange(self, command, dps=None):
+        """Send and receive a message, returning response from device.
+
+        Returns None if the device only acknowledged the command.
+        """
+        _LOGGER.debug("Sending command %s (device type: %s)", command, self.dev_type)
+        dev_type = self.dev_type
+        loop = asyncio.get_event_loop()
+
+        for attempt in range(2):
+            new_connection = await self.connect()
+            seqno = self.seqno
+            future = loop.create_future()
+            self._pending[seqno] = (self._templates[dev_type, command][0], future)
+            try:
+                self._writer.write(self._generate_payload(command, dps))
+                await self._writer.drain()
+                msg = await asyncio.wait_for(future, self.connection_timeout)
+                break
+            except (OSError, asyncio.TimeoutError) as ex:
+                # The device may silently drop a connection that has been idle, so
+                # retry once on a fresh connection before giving up
+                if new_connection or attempt > 0:
+                    self._connection_lost(ex)
+                    raise
+                _LOGGER.debug("Reconnecting to %s: %s", self.address, ex)
+                self.close()
+            finally:
+                self._pending.pop(seqno, None)
+
+        if not msg.payload:
+            return None
+        payload = self._decode_payload(msg.payload)
+
+        # Perform a new exchange (once) if we switched device type
+        if dev_type != self.dev_type:
+            _LOGGER.debug(
+                "Re-send %s due to device type change (%s -> %s)",
+                command,
+                dev_type,
+                self.dev_type,
+            )
+            return await self.exchange(command, dps)
+        return payload
+
+    async def status(self):
+        """Return device status."""
+        try:
+            return await self.exchange(STATUS)
+        except (OSError, asyncio.TimeoutError):
+            # Not reaching the device says nothing about its type
+            raise
+        except Exception:
+            self.dev_type = "type_0a"
+            raise
+
+    async def set_dps(self, value, dps_index):
+        """
+        Set value (may be any type: bool, int or string) of any dps index.
+
+        Args:
+            dps_index(int):   dps index to set
+            value: new value for the dps index
+        """
+        return await self.exchange(SET, {str(dps_index): value})
+
+    async def detect_available_dps(self, budget=DPS_DETECT_BUDGET):
+        """Return which datapoints are supported by the device.
+
+        The ranges of DPs of type_0d devices are all requested at once over
+        the same connection. Once budget seconds have passed, the DPs found
+        so far are returned.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + budget
+
+        # Learns the device type, and gets all DPs of type_0a devices
+        data = await asyncio.wait_for(self.status(), budget)
+        detected_dps = dict(data["dps"]) if data else {}
+        if self.dev_type == "type_0a":
+            return detected_dps
+
+        requests = [
+            asyncio.ensure_future(self.exchange(STATUS, dps_detect_request(dps_range)))
+            for dps_range in DPS_DETECT_RANGES
+        ]
+        done, pending = await asyncio.wait(
+            requests, timeout=max(0, deadline - loop.time())
+        )
+        for request in pending:
+            request.cancel()
+        if pending:
+            # Let the cancelled requests clean up before the caller goes on
+            await asyncio.wait(pending)
+            _LOGGER.warning(
+                "Detecting DPs of %s timed out, %d of %d ranges missing",
+                self.address,
+                len(pending),
+                len(requests),
+            )
+
+        for request in done:
+            try:
+                data = request.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.warning("Failed to get status: %s", ex)
+                continue
+            if data:
+                detected_dps.update(data["dps"])
+        return detected_dps
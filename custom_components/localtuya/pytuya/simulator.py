@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Simulated Tuya device for testing without hardware.
+
+Speaks the same protocol 3.1 and 3.3 framing and encryption as pytuya and
+answers like a real device:
+ * status requests (0x0a, or 0x0d for type_0d devices, which answer 0x0a with
+   "data unvalid")
+ * SET (0x07) with an acknowledgement, followed by a STATUS (0x08) push of the
+   changed DPs
+ * HEART_BEAT (0x09)
+
+DP changes made on the "device" (see SimulatedDevice.update_dps) are pushed
+to all connected clients, and responses can be delayed to simulate slow
+devices or networks.
+
+Run from the custom_components/localtuya directory:
+
+    python -m pytuya.simulator --local-key 0123456789abcdef --dps '{"1": true}'
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+from hashlib import md5
+
+from . import (
+    HEART_BEAT,
+    MESSAGE_RETCODE,
+    PROTOCOL_33_HEADER,
+    PROTOCOL_VERSION_BYTES_31,
+    PROTOCOL_VERSION_BYTES_33,
+    SET_COMMAND,
+    STATUS_PUSH,
+    AESCipher,
+    MessageDecoder,
+    TuyaMessage,
+    pack_message,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DP_QUERY = 0x0A
+CONTROL_NEW = 0x0D
+
+DATA_UNVALID = b"json obj data unvalid"
+
+
+class _DeviceProtocol(asyncio.Protocol):
+    """Connection from a client to a simulated device."""
+
+    def __init__(self, device):
+        """Initialize a new _DeviceProtocol."""
+        self.device = device
+        self.transport = None
+        self.decoder = MessageDecoder(has_retcode=False)
+
+    def connection_made(self, transport):
+        """Client connected."""
+        self.transport = transport
+        self.device.clients.add(self)
+
+    def connection_lost(self, exc):
+        """Client disconnected."""
+        self.device.clients.discard(self)
+
+    def data_received(self, data):
+        """Handle requests from the client."""
+        for msg in self.decoder.feed(data):
+            try:
+                self.device.handle_request(self, msg)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Failed to handle request %r", msg)
+
+    def send(self, seqno, cmd, payload):
+        """Send a message to the client, after the configured latency."""
+        if cmd != STATUS_PUSH or self.device.push_retcode:
+            payload = MESSAGE_RETCODE.pack(0) + payload
+        data = pack_message(TuyaMessage(seqno, cmd, 0, payload, 0))
+        if self.device.latency:
+            asyncio.get_event_loop().call_later(self.device.latency, self._write, data)
+        else:
+            self._write(data)
+
+    def _write(self, data):
+        if not self.transport.is_closing():
+            self.transport.write(data)
+
+
+class SimulatedDevice:
+    """Simulated Tuya device listening for connections."""
+
+    def __init__(
+        self,
+        dev_id,
+        local_key,
+        version=3.3,
+        dev_type="type_0a",
+        dps=None,
+        latency=0.0,
+        host="127.0.0.1",
+        port=6668,
+        push_retcode=True,
+    ):
+        """
+        Initialize a new SimulatedDevice.
+
+        Args:
+            dev_id (str): The device id.
+            local_key (str): The encryption key.
+            version (float): Protocol version, 3.1 or 3.3.
+            dev_type (str): "type_0a" or "type_0d", see pytuya.PAYLOAD_DICT.
+            dps (dict, optional): Initial values of the datapoints.
+            latency (float, optional): Seconds to delay every response by.
+            host (str, optional): Address to listen on.
+            port (int, optional): Port to listen on, 0 picks a free port.
+            push_retcode (bool, optional): Send a return code in status
+                pushes. Many 3.3 devices do not.
+        """
+        self.id = dev_id
+        self.local_key = local_key.encode("latin1")
+        self.version = version
+        self.dev_type = dev_type
+        self.dps = {str(index): value for index, value in (dps or {}).items()}
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.push_retcode = push_retcode
+        self.clients = set()
+        self.requests = 0
+        self._cipher = AESCipher(self.local_key)
+        self._server = None
+        self._push_task = None
+        self._seqno = 0
+
+    async def start(self):
+        """Start listening for connections."""
+        loop = asyncio.get_event_loop()
+        self._server = await loop.create_server(
+            lambda: _DeviceProtocol(self), self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        _LOGGER.debug("Simulated device %s listening on port %d", self.id, self.port)
+
+    async def stop(self):
+        """Stop listening and disconnect all clients."""
+        self.stop_auto_push()
+        self.disconnect_clients()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def disconnect_clients(self):
+        """Drop all client connections, like a device losing Wi-Fi."""
+        for client in list(self.clients):
+            client.transport.abort()
+
+    def update_dps(self, dps):
+        """Change DPs on the device and push the change to all clients."""
+        changed = {str(index): value for index, value in dps.items()}
+        self.dps.update(changed)
+        payload = self._encode(STATUS_PUSH, {"devId": self.id, "dps": changed})
+        self._seqno += 1
+        for client in list(self.clients):
+            client.send(self._seqno, STATUS_PUSH, payload)
+
+    def start_auto_push(self, interval, dps_indexes):
+        """Change the given integer DPs randomly every interval seconds.
+
+        Simulates e.g. a power meter, pushing status updates on its own.
+        """
+        self.stop_auto_push()
+
+        async def _push():
+            while True:
+                await asyncio.sleep(interval)
+                self.update_dps(
+                    {
+                        index: int(self.dps.get(str(index), 0)) + random.randint(-5, 5)
+                        for index in dps_indexes
+                    }
+                )
+
+        self._push_task = asyncio.ensure_future(_push())
+
+    def stop_auto_push(self):
+        """Stop changing DPs on a timer."""
+        if self._push_task is not None:
+            self._push_task.cancel()
+            self._push_task = None
+
+    def handle_request(self, client, msg):
+        """Answer a request from a client."""
+        self.requests += 1
+        if msg.cmd == HEART_BEAT:
+            client.send(msg.seqno, HEART_BEAT, b"")
+        elif msg.cmd in (DP_QUERY, CONTROL_NEW):
+            if msg.cmd == DP_QUERY and self.dev_type == "type_0d":
+                payload = DATA_UNVALID
+                if self.version == 3.3:
+                    payload = self._encrypt(payload)
+                client.send(msg.seqno, msg.cmd, payload)
+                return
+            request = self._decode(msg.cmd, msg.payload)
+            requested = [index for index in request.get("dps", {}) if index != "schema"]
+            dps = self.dps
+            if requested:
+                dps = {index: dps[index] for index in requested if index in dps}
+            payload = self._encode(msg.cmd, {"devId": self.id, "dps": dps})
+            client.send(msg.seqno, msg.cmd, payload)
+        elif msg.cmd == SET_COMMAND:
+            request = self._decode(msg.cmd, msg.payload)
+            client.send(msg.seqno, SET_COMMAND, b"")
+            self.update_dps(request.get("dps", {}))
+        else:
+            _LOGGER.debug("Ignoring unknown command %r", msg.cmd)
+
+    def _encrypt(self, data):
+        return self._cipher.encrypt(data, False)
+
+    def _decode(self, cmd, payload):
+        """Decode payload of a request."""
+        if self.version == 3.3:
+            if payload.startswith(PROTOCOL_VERSION_BYTES_33):
+                payload = payload[len(PROTOCOL_33_HEADER) :]
+            return json.loads(self._cipher.decrypt(payload, False))
+        if payload.startswith(PROTOCOL_VERSION_BYTES_31):
+            # version header and MD5 digest, followed by base64 encrypted data
+            payload = payload[len(PROTOCOL_VERSION_BYTES_31) + 16 :]
+            return json.loads(self._cipher.decrypt(payload))
+        return json.loads(payload)
+
+    def _encode(self, cmd, data):
+        """Encode payload of a response the way devices do."""
+        payload = json.dumps(data, separators=(",", ":")).encode()
+        if self.version == 3.3:
+            payload = self._encrypt(payload)
+            if cmd != DP_QUERY:
+                payload = PROTOCOL_33_HEADER + payload
+        elif cmd == STATUS_PUSH:
+            payload = self._cipher.encrypt(payload)
+            digest = md5(
+                b"data="
+                + payload
+                + b"||lpv="
+                + PROTOCOL_VERSION_BYTES_31
+                + b"||"
+                + self.local_key
+            ).hexdigest()
+            payload = (
+                PROTOCOL_VERSION_BYTES_31 + digest[8:][:16].encode("latin1") + payload
+            )
+        return payload
+
+
+def main():
+    """Run a simulated device until interrupted."""
+    parser = argparse.ArgumentParser(description="Simulated Tuya device")
+    parser.add_argument("--device-id", default="01234567891234567890")
+    parser.add_argument("--local-key", default="0123456789abcdef")
+    parser.add_argument("--protocol-version", type=float, default=3.3)
+    parser.add_argument("--dev-type", default="type_0a")
+    parser.add_argument("--dps", type=json.loads, default={"1": True})
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=6668)
+    parser.add_argument("--push-interval", type=float)
+    parser.add_argument("--push-dps", type=json.loads, default=[])
+    parser.add_argument(
+        "--no-push-retcode",
+        dest="push_retcode",
+        action="store_false",
+        help="send status pushes without return code",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    loop = asyncio.get_event_loop()
+    device = SimulatedDevice(
+        args.device_id,
+        args.local_key,
+        version=args.protocol_version,
+        dev_type=args.dev_type,
+        dps=args.dps,
+        latency=args.latency,
+        host=args.host,
+        port=args.port,
+        push_retcode=args.push_retcode,
+    )
+    loop.run_until_complete(device.start())
+    if args.push_interval:
+        device.start_auto_push(args.push_interval, args.push_dps)
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(device.stop())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Retrying of device operations, and failing fast when a device is down."""
+import asyncio
+import logging
+import random
+
+from . import pytuya
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Operation not attempted because the device keeps failing."""
+
+
+def is_retryable(ex):
+    """Return if an operation that failed with ex may succeed when retried.
+
+    Network errors and timeouts are transient. Anything else, like a reply
+    that cannot be decrypted because of a wrong local key or protocol
+    version, fails the same way every time.
+    """
+    return isinstance(ex, (OSError, asyncio.TimeoutError, pytuya.DecodeError))
+
+
+class RetryPolicy:
+    """Retry failed operations with exponential backoff, within a deadline.
+
+    The delay before retry n is base_delay * 2 ** n, capped at max_delay and
+    randomly shortened by up to half to spread retries of many devices. An
+    operation is never retried after a non-retryable error, and never runs
+    past its deadline: a call blocks for at most deadline seconds.
+    """
+
+    def __init__(
+        self,
+        attempts=3,
+        base_delay=0.5,
+        max_delay=4.0,
+        deadline=15.0,
+        retryable=is_retryable,
+    ):
+        """Initialize a new RetryPolicy."""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable = retryable
+
+    def delay(self, attempt):
+        """Return seconds to wait before retrying after attempt failed."""
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def run(self, func, *args):
+        """Return result of awaiting func(*args), retrying it if it fails.
+
+        Raises the error of the last attempt. Cancelling the call cancels the
+        running attempt and stops retrying.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(func(*args), deadline - loop.time())
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:  # pylint: disable=broad-except
+                attempt += 1
+                delay = self.delay(attempt - 1)
+                if (
+                    attempt >= self.attempts
+                    or not self.retryable(ex)
+                    or loop.time() + delay >= deadline
+                ):
+                    raise
+                _LOGGER.debug(
+                    "Attempt %d of %d failed, retrying in %.1f s: %r",
+                    attempt,
+                    self.attempts,
+                    delay,
+                    ex,
+                )
+                await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Stop trying to reach a device that keeps failing.
+
+    After failure_threshold failed operations in a row the breaker opens and
+    no operations are allowed. Once reset_timeout has passed it is half-open
+    and allows a single probe: if that succeeds the breaker closes, otherwise
+    it opens again for twice as long, up to max_reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30, max_reset_timeout=1800):
+        """Initialize a new CircuitBreaker."""
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        """Return state of the breaker."""
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.retry_in > 0:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def retry_in(self):
+        """Return seconds until the breaker allows a probe."""
+        if self._opened_at is None:
+            return 0
+        elapsed = asyncio.get_event_loop().time() - self._opened_at
+        return max(0, self.reset_timeout - elapsed)
+
+    def allow_request(self):
+        """Return if an operation may be attempted, counting it as probe."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        """Note that an operation succeeded."""
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self._opened_at = None
+        self._probing = False
+
+    def record_cancelled(self):
+        """Note that an operation was cancelled before it finished."""
+        self._probing = False
+
+    def record_failure(self):
+        """Note that an operation failed."""
+        self.failures += 1
+        if self._opened_at is not None:
+            if not self._probing:
+                # Started before the breaker opened
+                return
+            # The probe failed, so wait longer before the next one
+            self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+        elif self.failures < self.failure_threshold:
+            return
+        self._opened_at = asyncio.get_event_loop().time()
+        self._probing = False
@@ -0,0 +1,306 @@
+"""Integration-wide scheduling of device polls and reconnects."""
+import asyncio
+import collections
+import heapq
+import logging
+import random
+
+_LOGGER = logging.getLogger(__name__)
+
+# Polls started per second, over all devices
+DEFAULT_POLL_RATE = 5.0
+
+# Polls running at the same time, over all devices
+DEFAULT_MAX_IN_FLIGHT = 8
+
+# Poll intervals are randomly varied by this fraction, so that devices added
+# at the same time drift apart instead of being polled in lockstep
+JITTER = 0.1
+
+# Seconds a poll may start late before the scheduler is considered behind
+BEHIND_THRESHOLD = 5
+
+# Minimum seconds between two warnings about being behind schedule
+BEHIND_REPORT_INTERVAL = 300
+
+# Devices failing within OUTAGE_WINDOW seconds of each other, if at least
+# OUTAGE_MIN_DEVICES, are considered hit by the same outage. Their reconnects
+# are spread over OUTAGE_SPREAD seconds per device, up to OUTAGE_MAX_SPREAD
+OUTAGE_WINDOW = 30
+OUTAGE_MIN_DEVICES = 3
+OUTAGE_SPREAD = 2
+OUTAGE_MAX_SPREAD = 120
+
+
+class _PollEntry:
+    """A periodically polled device."""
+
+    def __init__(self, poll, interval):
+        """Initialize a new _PollEntry."""
+        self.poll = poll
+        self.interval = interval
+        self.due = None
+        self.removed = False
+
+
+class PollScheduler:
+    """Run periodic polls of all devices within a global budget.
+
+    Polls are spread over time and limited both in rate and in how many run
+    concurrently, so that many devices never hit the network at once. A
+    device is polled again one interval after its previous poll finished.
+    """
+
+    def __init__(
+        self, hass, rate=DEFAULT_POLL_RATE, max_in_flight=DEFAULT_MAX_IN_FLIGHT
+    ):
+        """Initialize a new PollScheduler."""
+        self._hass = hass
+        self._spacing = 1 / rate
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._entries = {}
+        self._queue = []
+        self._counter = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._next_start = 0
+        self._last_report = None
+        self.lag = 0
+
+    def async_add(self, key, poll, interval):
+        """Poll a device every interval seconds, first time at a random time.
+
+        Returns a function that stops polling the device.
+        """
+        entry = _PollEntry(poll, interval)
+        if key in self._entries:
+            self._entries[key].removed = True
+        self._entries[key] = entry
+        self._schedule(entry, random.uniform(0, interval))
+        if self._task is None:
+            self._task = self._hass.async_create_task(self._run())
+
+        def remove():
+            entry.removed = True
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+        return remove
+
+    def async_set_interval(self, key, interval):
+        """Change poll interval of a device.
+
+        A poll that is now overdue, or due sooner than before, is brought
+        forward. Otherwise the new interval applies from the next poll on.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.interval = interval
+        if entry.due is not None and entry.due > self._hass.loop.time() + interval:
+            self._schedule(entry, interval)
+
+    def async_stop(self, _event=None):
+        """Stop polling all devices."""
+        for entry in self._entries.values():
+            entry.removed = True
+        self._entries.clear()
+        self._queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _schedule(self, entry, delay):
+        """Schedule next poll of entry after delay seconds."""
+        entry.due = self._hass.loop.time() + delay
+        self._counter += 1
+        heapq.heappush(self._queue, (entry.due, self._counter, entry))
+        self._wakeup.set()
+
+    def _next_entry(self):
+        """Return entry that is due next, dropping removed ones."""
+        while self._queue:
+            due, _, entry = self._queue[0]
+            # Entries are queued again when rescheduled, skip the outdated ones
+            if not entry.removed and due == entry.due:
+                return entry
+            heapq.heappop(self._queue)
+        return None
+
+    async def _run(self):
+        """Start polls as they become due."""
+        loop = self._hass.loop
+        while True:
+            self._wakeup.clear()
+            entry = self._next_entry()
+            if entry is None:
+                await self._wakeup.wait()
+                continue
+            delay = entry.due - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            due, entry.due = entry.due, None
+            await self._in_flight.acquire()
+            delay = self._next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            self._next_start = max(now, self._next_start) + self._spacing
+            self._report_lag(now - due)
+            self._hass.async_create_task(self._poll(entry))
+
+    async def _poll(self, entry):
+        """Poll a device and schedule its next poll."""
+        try:
+            # The device may have been removed while waiting for a slot
+            if not entry.removed:
+                await entry.poll()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Polling device failed")
+        finally:
+            self._in_flight.release()
+        if not entry.removed:
+            jitter = random.uniform(1 - JITTER, 1 + JITTER)
+            self._schedule(entry, entry.interval * jitter)
+
+    def _report_lag(self, lag):
+        """Warn if polls are started too late to keep up."""
+        self.lag = lag
+        if lag < BEHIND_THRESHOLD:
+            return
+        now = self._hass.loop.time()
+        if self._last_report is not None:
+            if now - self._last_report < BEHIND_REPORT_INTERVAL:
+                return
+        self._last_report = now
+        _LOGGER.warning(
+            "Polling of %d devices is %.0f seconds behind schedule, "
+            "consider longer poll intervals",
+            len(self._entries),
+            lag,
+        )
+
+
+class _ReconnectEntry:
+    """A device waiting to reconnect."""
+
+    def __init__(self, connect, priority):
+        """Initialize a new _ReconnectEntry."""
+        self.connect = connect
+        self.priority = priority
+        self.cancelled = False
+
+
+class ReconnectCoordinator:
+    """Spread reconnects of devices that lost their connection together.
+
+    When many devices fail within a short time, e.g. after a router reboot
+    or power outage, their reconnects are spread randomly over a time that
+    grows with the number of devices. At most max_in_flight connects run at
+    once, and devices flagged as priority are connected first and are never
+    delayed by spreading.
+    """
+
+    def __init__(self, hass, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """Initialize a new ReconnectCoordinator."""
+        self._hass = hass
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._queue = []
+        self._ready = collections.deque()
+        self._counter = 0
+        # Time of the last failure of each device
+        self._failures = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def async_schedule(self, key, connect, delay, priority=False):
+        """Call connect of device key after at least delay seconds.
+
+        Returns a function that cancels the reconnect.
+        """
+        loop = self._hass.loop
+        now = loop.time()
+        # Count devices, a single flapping device must not look like an outage
+        self._failures[key] = now
+        self._failures = {
+            device: failed
+            for device, failed in self._failures.items()
+            if now - failed <= OUTAGE_WINDOW
+        }
+        if not priority and len(self._failures) >= OUTAGE_MIN_DEVICES:
+            spread = min(OUTAGE_MAX_SPREAD, len(self._failures) * OUTAGE_SPREAD)
+            delay += random.uniform(0, spread)
+
+        entry = _ReconnectEntry(connect, priority)
+        self._counter += 1
+        heapq.heappush(self._queue, (now + delay, self._counter, entry))
+        self._wakeup.set()
+        if self._task is None:
+            self._task = self._hass.async_create_task(self._run())
+
+        def cancel():
+            entry.cancelled = True
+
+        return cancel
+
+    def async_stop(self, _event=None):
+        """Cancel all reconnects."""
+        for _, _, entry in self._queue:
+            entry.cancelled = True
+        for entry in self._ready:
+            entry.cancelled = True
+        self._queue.clear()
+        self._ready.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _move_due(self):
+        """Move entries that are due to the ready queue, priority first."""
+        now = self._hass.loop.time()
+        while self._queue and self._queue[0][0] <= now:
+            entry = heapq.heappop(self._queue)[2]
+            if entry.cancelled:
+                continue
+            if entry.priority:
+                self._ready.appendleft(entry)
+            else:
+                self._ready.append(entry)
+
+    async def _run(self):
+        """Start reconnects as they become due."""
+        loop = self._hass.loop
+        while True:
+            self._wakeup.clear()
+            self._move_due()
+            if self._ready:
+                await self._in_flight.acquire()
+                # More, possibly more important, devices may be due by now
+                self._move_due()
+                entry = self._ready.popleft()
+                if entry.cancelled:
+                    self._in_flight.release()
+                    continue
+                self._hass.async_create_task(self._connect(entry))
+                continue
+
+            timeout = self._queue[0][0] - loop.time() if self._queue else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _connect(self, entry):
+        """Reconnect a device."""
+        try:
+            await entry.connect()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Reconnecting device failed")
+        finally:
+            self._in_flight.release()
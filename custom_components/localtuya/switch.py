@@ -65,6 +65,7 @@ class LocaltuyaSwitch(LocalTuyaEntity, SwitchEntity):
         """Initialize the Tuya switch."""
         super().__init__(device, config_entry, switchid, **kwargs)
         self._state = None
+        self._attrs = {}
         print("Initialized switch [{}]".format(self.name))
 
     @property
@@ -75,6 +76,27 @@ class LocaltuyaSwitch(LocalTuyaEntity, SwitchEntity):
     @property
     def device_state_attributes(self):
         """Return device state attributes."""
+        return self._attrs
+
+    async def async_turn_on(self, **kwargs):
+        """Turn Tuya switch on."""
+        await self._device.set_dps(True, self._dps_id)
+
+    async def async_turn_off(self, **kwargs):
+        """Turn Tuya switch off."""
+        await self._device.set_dps(False, self._dps_id)
+
+    def used_dps(self):
+        """Return ids of the DPs that the state of the entity depends on."""
+        used = super().used_dps()
+        for attr in (CONF_CURRENT, CONF_CURRENT_CONSUMPTION, CONF_VOLTAGE):
+            if self.has_config(attr):
+                used.add(str(self._config[attr]))
+        return used
+
+    def status_updated(self):
+        """Device status was updated."""
+        self._state = self.dps(self._dps_id)
         attrs = {}
         if self.has_config(CONF_CURRENT):
             attrs[ATTR_CURRENT] = self.dps(self._config[CONF_CURRENT])
@@ -84,16 +106,4 @@ class LocaltuyaSwitch(LocalTuyaEntity, SwitchEntity):
             )
         if self.has_config(CONF_VOLTAGE):
             attrs[ATTR_VOLTAGE] = self.dps(self._config[CONF_VOLTAGE]) / 10
-        return attrs
-
-    def turn_on(self, **kwargs):
-        """Turn Tuya switch on."""
-        self._device.set_dps(True, self._dps_id)
-
-    def turn_off(self, **kwargs):
-        """Turn Tuya switch off."""
-        self._device.set_dps(False, self._dps_id)
-
-    def status_updated(self):
-        """Device status was updated."""
-        self._state = self.dps(self._dps_id)
+        self._attrs = attrs
@@ -0,0 +1,37 @@
+"""Test configuration for the pytuya and integration tests."""
+import asyncio
+import importlib.util
+import inspect
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# pytuya does not depend on Home Assistant, so it is imported on its own
+sys.path.insert(0, os.path.join(ROOT, "custom_components", "localtuya"))
+sys.path.insert(0, ROOT)
+
+if importlib.util.find_spec("homeassistant") is None:
+    # Only pytuya can be tested without Home Assistant installed
+    collect_ignore = [
+        "test_common.py",
+        "test_cover.py",
+        "test_retry.py",
+        "test_scheduler.py",
+    ]
+else:
+    # Home Assistant imports this early when starting, importing the config
+    # entries of the integration first fails on a circular import
+    import homeassistant.helpers.config_validation  # noqa: F401
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run coroutine test functions in a new event loop."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    argnames = pyfuncitem._fixtureinfo.argnames  # pylint: disable=protected-access
+    kwargs = {name: pyfuncitem.funcargs[name] for name in argnames}
+    asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
@@ -0,0 +1,59 @@
+"""Helpers for the integration tests, running Home Assistant."""
+from homeassistant.const import (
+    CONF_DEVICE_ID,
+    CONF_ENTITIES,
+    CONF_FRIENDLY_NAME,
+    CONF_HOST,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import HomeAssistant
+
+from custom_components.localtuya.common import TuyaDevice
+from custom_components.localtuya.const import CONF_LOCAL_KEY, CONF_PROTOCOL_VERSION
+from helpers import DEV_ID, LOCAL_KEY
+
+
+class HomeAssistantContext:
+    """Run Home Assistant with its configuration in a directory."""
+
+    def __init__(self, config_dir):
+        """Initialize a new HomeAssistantContext."""
+        self.config_dir = str(config_dir)
+        self.hass = None
+
+    async def __aenter__(self):
+        """Create Home Assistant, which needs a running event loop."""
+        self.hass = HomeAssistant()
+        self.hass.config.config_dir = self.config_dir
+        return self.hass
+
+    async def __aexit__(self, *exc):
+        """Stop Home Assistant, leaving the event loop to the test runner."""
+        self.hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        await self.hass.async_block_till_done()
+
+
+def home_assistant(config_dir):
+    """Return context manager running Home Assistant."""
+    return HomeAssistantContext(config_dir)
+
+
+def make_tuya_device(hass, device, entities, **kwargs):
+    """Return a TuyaDevice for a simulated device.
+
+    Extra keyword arguments are added to the config entry data.
+    """
+    tuya_device = TuyaDevice(
+        hass,
+        {
+            CONF_DEVICE_ID: DEV_ID,
+            CONF_HOST: device.host,
+            CONF_LOCAL_KEY: LOCAL_KEY,
+            CONF_PROTOCOL_VERSION: str(device.version),
+            CONF_FRIENDLY_NAME: "Simulated device",
+            CONF_ENTITIES: entities,
+            **kwargs,
+        },
+    )
+    tuya_device._interface.port = device.port  # pylint: disable=protected-access
+    return tuya_device
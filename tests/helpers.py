@@ -0,0 +1,54 @@
+"""Helpers for the pytuya tests."""
+import pytuya
+from pytuya.simulator import SimulatedDevice
+
+DEV_ID = "01234567891234567890"
+LOCAL_KEY = "0123456789abcdef"
+
+
+class SimulatedDeviceContext:
+    """Run a simulated device listening on a free port."""
+
+    def __init__(self, **kwargs):
+        """Initialize a new SimulatedDeviceContext."""
+        self.device = SimulatedDevice(DEV_ID, LOCAL_KEY, port=0, **kwargs)
+
+    async def __aenter__(self):
+        """Start the device."""
+        await self.device.start()
+        return self.device
+
+    async def __aexit__(self, *exc):
+        """Stop the device."""
+        await self.device.stop()
+
+
+def simulated_device(**kwargs):
+    """Return context manager running a simulated device."""
+    return SimulatedDeviceContext(**kwargs)
+
+
+def make_interface(device, **kwargs):
+    """Return an AsyncTuyaInterface for a simulated device."""
+    interface = pytuya.AsyncTuyaInterface(
+        DEV_ID, device.host, LOCAL_KEY, device.version, **kwargs
+    )
+    interface.port = device.port
+    return interface
+
+
+class RecordingListener(pytuya.TuyaListener):
+    """Listener recording what the interface reports."""
+
+    def __init__(self):
+        """Initialize a new RecordingListener."""
+        self.updates = []
+        self.disconnects = 0
+
+    def status_updated(self, status):
+        """Record a pushed status update."""
+        self.updates.append(status)
+
+    def disconnected(self):
+        """Record loss of the connection."""
+        self.disconnects += 1
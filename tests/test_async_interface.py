@@ -0,0 +1,196 @@
+"""Tests for AsyncTuyaInterface against a simulated device."""
+import asyncio
+
+import pytest
+
+import pytuya
+from helpers import RecordingListener, make_interface, simulated_device
+
+DPS = {"1": True, "2": 128, "15": "colour", "104": 7}
+
+PROTOCOLS = pytest.mark.parametrize(
+    "version,dev_type",
+    [
+        (3.1, "type_0a"),
+        (3.3, "type_0a"),
+        (3.3, "type_0d"),
+    ],
+)
+
+
+async def wait_for(condition, timeout=2):
+    """Wait until condition() is true."""
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+@PROTOCOLS
+async def test_status(version, dev_type):
+    """Test reading status, learning the device type on the way."""
+    async with simulated_device(version=version, dev_type=dev_type, dps=DPS) as dev:
+        interface = make_interface(dev, heartbeat_interval=0)
+        try:
+            status = await interface.status()
+        finally:
+            interface.close()
+    assert status["dps"] == DPS
+    assert interface.dev_type == dev_type
+
+
+@PROTOCOLS
+async def test_set_dps_is_pushed(version, dev_type):
+    """Test changing a DP, and receiving the change pushed by the device."""
+    listener = RecordingListener()
+    async with simulated_device(version=version, dev_type=dev_type, dps=DPS) as dev:
+        interface = make_interface(dev, heartbeat_interval=0, listener=listener)
+        try:
+            await interface.set_dps(False, 1)
+            await wait_for(lambda: listener.updates)
+        finally:
+            interface.close()
+    assert dev.dps["1"] is False
+    assert listener.updates == [{"devId": dev.id, "dps": {"1": False}}]
+
+
+async def test_pushed_updates():
+    """Test changes made on the device reach the listener."""
+    listener = RecordingListener()
+    async with simulated_device(dps=DPS) as dev:
+        interface = make_interface(dev, heartbeat_interval=0, listener=listener)
+        try:
+            await interface.connect()
+            dev.update_dps({2: 10})
+            dev.update_dps({2: 20})
+            await wait_for(lambda: len(listener.updates) == 2)
+        finally:
+            interface.close()
+    assert [update["dps"] for update in listener.updates] == [{"2": 10}, {"2": 20}]
+
+
+@PROTOCOLS
+async def test_pushed_updates_without_retcode(version, dev_type):
+    """Test pushes without return code, as sent by many 3.3 devices."""
+    listener = RecordingListener()
+    async with simulated_device(
+        version=version, dev_type=dev_type, dps=DPS, push_retcode=False
+    ) as dev:
+        interface = make_interface(dev, heartbeat_interval=0, listener=listener)
+        try:
+            await interface.status()
+            dev.update_dps({2: 10})
+            await wait_for(lambda: listener.updates)
+        finally:
+            interface.close()
+    assert listener.updates == [{"devId": dev.id, "dps": {"2": 10}}]
+
+
+async def test_push_with_seqno_of_pending_request(monkeypatch):
+    """Test a push numbered like a pending request does not answer it."""
+    listener = RecordingListener()
+    async with simulated_device(dps=DPS) as dev:
+        handle_request = dev.handle_request
+
+        def push_then_answer(client, msg):
+            if msg.cmd != pytuya.HEART_BEAT:
+                # The device numbers its push like the request being answered
+                dev._seqno = msg.seqno - 1  # pylint: disable=protected-access
+                dev.update_dps({2: 6})
+            handle_request(client, msg)
+
+        monkeypatch.setattr(dev, "handle_request", push_then_answer)
+        interface = make_interface(dev, heartbeat_interval=0, listener=listener)
+        try:
+            await interface.connect()
+            status = await interface.status()
+        finally:
+            interface.close()
+    assert status["dps"] == {**DPS, "2": 6}
+    assert listener.updates == [{"devId": dev.id, "dps": {"2": 6}}]
+
+
+async def test_pipelined_requests():
+    """Test concurrent requests share one connection and get their answers."""
+    async with simulated_device(dps=DPS, latency=0.1) as dev:
+        interface = make_interface(dev, heartbeat_interval=0)
+        try:
+            loop = asyncio.get_event_loop()
+            start = loop.time()
+            results = await asyncio.gather(
+                *[interface.exchange(pytuya.STATUS, {str(i): None}) for i in (1, 2)],
+                *[interface.status() for _ in range(8)],
+            )
+            elapsed = loop.time() - start
+        finally:
+            interface.close()
+    assert [result["dps"] for result in results[:2]] == [{"1": True}, {"2": 128}]
+    assert all(result["dps"] == DPS for result in results[2:])
+    assert dev.requests == 10
+    # Requests were in flight together instead of one after another
+    assert elapsed < 0.5
+
+
+async def test_reconnect_after_connection_lost():
+    """Test the listener is told about a lost connection, and reconnecting."""
+    listener = RecordingListener()
+    async with simulated_device(dps=DPS) as dev:
+        interface = make_interface(dev, heartbeat_interval=0, listener=listener)
+        try:
+            await interface.connect()
+            dev.disconnect_clients()
+            await wait_for(lambda: listener.disconnects)
+            assert not interface.is_connected
+            status = await interface.status()
+        finally:
+            interface.close()
+    assert status["dps"] == DPS
+    assert listener.disconnects == 1
+
+
+async def test_heartbeat_loss(monkeypatch):
+    """Test a device that stops answering heartbeats is considered lost."""
+    monkeypatch.setattr(pytuya, "HEARTBEAT_TIMEOUT", 0.05)
+    listener = RecordingListener()
+    async with simulated_device(dps=DPS) as dev:
+        interface = make_interface(dev, heartbeat_interval=0.05, listener=listener)
+        try:
+            await interface.connect()
+            await asyncio.sleep(0.2)
+            assert interface.is_connected
+            assert listener.disconnects == 0
+
+            # The device hangs, but keeps the connection open
+            monkeypatch.setattr(dev, "handle_request", lambda client, msg: None)
+            await wait_for(lambda: listener.disconnects)
+        finally:
+            interface.close()
+    assert not interface.is_connected
+
+
+@PROTOCOLS
+async def test_detect_available_dps(version, dev_type):
+    """Test all DPs are detected."""
+    async with simulated_device(version=version, dev_type=dev_type, dps=DPS) as dev:
+        interface = make_interface(dev, heartbeat_interval=0)
+        try:
+            detected = await interface.detect_available_dps()
+        finally:
+            interface.close()
+    assert detected == DPS
+    assert interface.dev_type == dev_type
+
+
+async def test_detect_available_dps_budget():
+    """Test detection returns what was found when the budget runs out."""
+    async with simulated_device(dev_type="type_0d", dps=DPS, latency=0.2) as dev:
+        interface = make_interface(dev, heartbeat_interval=0)
+        try:
+            detected = await interface.detect_available_dps(budget=0.5)
+            # Cancelled range requests are no longer waiting for an answer
+            assert not interface._pending  # pylint: disable=protected-access
+        finally:
+            interface.close()
+    # The full status read learning the device type completes in time
+    assert detected == DPS
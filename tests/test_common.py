@@ -0,0 +1,174 @@
+"""Tests for the device cache shared by all platforms."""
+import asyncio
+
+from homeassistant.const import CONF_FRIENDLY_NAME, CONF_ID, CONF_PLATFORM
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.localtuya import common
+from custom_components.localtuya.const import (
+    CONF_FRESH_TTL,
+    CONF_MAX_STALE,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_WRITE_DELAY,
+)
+from hass_helpers import home_assistant, make_tuya_device
+from helpers import simulated_device
+
+DPS = {"1": True, "2": 10, "3": 20}
+
+SWITCH = {CONF_ID: 1, CONF_PLATFORM: "switch", CONF_FRIENDLY_NAME: "Switch"}
+
+
+def recorder(updates):
+    """Return dispatcher target appending status updates to updates."""
+
+    @callback
+    def record(status):
+        updates.append(status)
+
+    return record
+
+
+async def test_refresh_dps_single_flight(tmp_path):
+    """Test DPs are not read again while a read is in progress."""
+    async with home_assistant(tmp_path) as hass, simulated_device(
+        dps=DPS, latency=0.1
+    ) as device:
+        tuya_device = make_tuya_device(hass, device, [SWITCH])
+        try:
+            await tuya_device.async_connect()
+            device.dps["2"] = 11
+            requests = device.requests
+            await asyncio.gather(
+                tuya_device.async_refresh_dps([2]), tuya_device.async_refresh_dps([2])
+            )
+            assert device.requests == requests + 1
+            assert tuya_device.status()["dps"]["2"] == 11
+
+            # A full refresh in progress reads the DPs as well
+            refresh = hass.async_create_task(tuya_device.async_refresh())
+            await asyncio.sleep(0)
+            await tuya_device.async_refresh_dps([2])
+            await refresh
+            assert device.requests == requests + 2
+        finally:
+            tuya_device.close()
+
+
+async def test_writes_coalesced(tmp_path):
+    """Test changes within the write delay are sent in one message."""
+    async with home_assistant(tmp_path) as hass, simulated_device(dps=DPS) as device:
+        tuya_device = make_tuya_device(
+            hass, device, [SWITCH], **{CONF_WRITE_DELAY: 0.1}
+        )
+        try:
+            await tuya_device.async_connect()
+            requests = device.requests
+            await asyncio.gather(
+                tuya_device.set_dps(False, 1),
+                tuya_device.set_dps(12, 2),
+                tuya_device.set_dps_set({2: 13, 3: 21}),
+            )
+            assert device.requests == requests + 1
+            assert device.dps == {"1": False, "2": 13, "3": 21}
+            assert tuya_device.status()["dps"] == device.dps
+        finally:
+            tuya_device.close()
+
+
+async def test_poll_interval_adapts(tmp_path, monkeypatch):
+    """Test devices are polled often while changing and after commands."""
+    now = [1000.0]
+    monkeypatch.setattr(common, "time", lambda: now[0])
+    async with home_assistant(tmp_path) as hass, simulated_device(dps=DPS) as device:
+        tuya_device = make_tuya_device(
+            hass,
+            device,
+            [SWITCH],
+            **{CONF_MIN_POLL_INTERVAL: 10, CONF_MAX_POLL_INTERVAL: 300},
+        )
+        try:
+            await tuya_device.async_connect()
+            for _ in range(6):
+                now[0] += 20
+                device.dps["2"] += 1
+                await tuya_device.async_update()
+            assert tuya_device.poll_interval < 30
+
+            now[0] += 1000
+            await tuya_device.async_update()
+            assert tuya_device.poll_interval == 300
+
+            await tuya_device.set_dps(False, 1)
+            assert tuya_device.poll_interval == 10
+        finally:
+            tuya_device.close()
+
+
+async def test_status_served_from_cache(tmp_path, monkeypatch):
+    """Test cached status is served fresh, then stale while refreshed."""
+    now = [1000.0]
+    monkeypatch.setattr(common, "time", lambda: now[0])
+    async with home_assistant(tmp_path) as hass, simulated_device(dps=DPS) as device:
+        tuya_device = make_tuya_device(
+            hass, device, [SWITCH], **{CONF_FRESH_TTL: 30, CONF_MAX_STALE: 900}
+        )
+        try:
+            await tuya_device.async_connect()
+            requests = device.requests
+            device.dps["2"] = 11
+
+            # Fresh status is served without asking the device
+            now[0] += 29
+            assert tuya_device.status()["dps"]["2"] == 10
+            await hass.async_block_till_done()
+            assert device.requests == requests
+
+            # Stale status is served while it is refreshed in the background
+            now[0] += 1
+            assert tuya_device.status()["dps"]["2"] == 10
+            await hass.async_block_till_done()
+            assert device.requests == requests + 1
+            assert tuya_device.status()["dps"]["2"] == 11
+
+            # Status older than max stale is not served
+            now[0] += 900
+            assert tuya_device.status() is None
+            await hass.async_block_till_done()
+            assert tuya_device.status()["dps"]["2"] == 11
+        finally:
+            tuya_device.close()
+
+
+async def test_status_dispatched_to_affected_entities(tmp_path):
+    """Test only entities using changed DPs are updated."""
+    sensor = {CONF_ID: 2, CONF_PLATFORM: "sensor", CONF_FRIENDLY_NAME: "Sensor"}
+    async with home_assistant(tmp_path) as hass, simulated_device(dps=DPS) as device:
+        tuya_device = make_tuya_device(hass, device, [SWITCH, sensor])
+        updates = {1: [], 2: []}
+        for entity_id, used_dps in ((1, {"1"}), (2, {"2", "3"})):
+            tuya_device.async_register_entity(entity_id, used_dps)
+            async_dispatcher_connect(
+                hass,
+                tuya_device.entity_signal(entity_id),
+                recorder(updates[entity_id]),
+            )
+        try:
+            # All entities are updated when the device becomes available
+            await tuya_device.async_connect()
+            await hass.async_block_till_done()
+            assert [len(updates[1]), len(updates[2])] == [1, 1]
+
+            tuya_device.status_updated({"dps": {"3": 21}})
+            tuya_device.status_updated({"dps": {"1": True}})
+            await hass.async_block_till_done()
+            assert [len(updates[1]), len(updates[2])] == [1, 2]
+            assert updates[2][-1]["dps"]["3"] == 21
+
+            tuya_device.status_updated({"dps": {"1": False, "2": 11}})
+            await hass.async_block_till_done()
+            assert [len(updates[1]), len(updates[2])] == [2, 3]
+        finally:
+            tuya_device.close()
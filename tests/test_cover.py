@@ -0,0 +1,150 @@
+"""Tests for the cover platform."""
+from homeassistant.const import CONF_FRIENDLY_NAME, CONF_ID, CONF_PLATFORM
+
+from custom_components.localtuya.const import (
+    CONF_OPENCLOSE_CMDS,
+    CONF_POSITIONING_MODE,
+    CONF_SPAN_TIME,
+    CONF_WRITE_DELAY,
+)
+from custom_components.localtuya import cover as cover_module
+from custom_components.localtuya.cover import (
+    CoverTravel,
+    LocaltuyaCover,
+    PositionSamples,
+)
+from hass_helpers import home_assistant, make_tuya_device
+from helpers import simulated_device
+
+FAKE_COVER = {
+    CONF_ID: 1,
+    CONF_PLATFORM: "cover",
+    CONF_FRIENDLY_NAME: "Fake cover",
+    CONF_OPENCLOSE_CMDS: "on_off",
+    CONF_POSITIONING_MODE: "fake",
+    CONF_SPAN_TIME: 10.0,
+}
+
+
+class FakeCoverContext:
+    """Run a fake positioning cover of a simulated device."""
+
+    def __init__(self, config_dir, position):
+        """Initialize a new FakeCoverContext."""
+        self._hass = home_assistant(config_dir)
+        self._device = simulated_device(dps={"1": "stop"})
+        self._position = position
+        self._tuya_device = None
+
+    async def __aenter__(self):
+        """Start the device and create the cover at the estimated position."""
+        hass = await self._hass.__aenter__()
+        device = await self._device.__aenter__()
+        self._tuya_device = make_tuya_device(
+            hass, device, [FAKE_COVER], **{CONF_WRITE_DELAY: 0}
+        )
+        cover = LocaltuyaCover(self._tuya_device, None, 1)
+        cover.hass = hass
+        cover.entity_id = "cover.fake_cover"
+        cover._travel.stop(self._position)  # pylint: disable=protected-access
+        return device, cover
+
+    async def __aexit__(self, *exc):
+        """Stop the cover, the device and Home Assistant."""
+        self._tuya_device.close()
+        await self._device.__aexit__(*exc)
+        await self._hass.__aexit__(*exc)
+
+
+async def test_fake_close_when_estimated_closed(tmp_path):
+    """Test closing is sent even if the cover is estimated to be closed."""
+    async with FakeCoverContext(tmp_path, 0.0) as (device, cover):
+        await cover.async_close_cover()
+        assert device.dps["1"] == "off"
+        assert cover.current_cover_position == 0
+        assert not cover.is_closing
+
+
+async def test_fake_open_when_estimated_open(tmp_path):
+    """Test opening is sent even if the cover is estimated to be open."""
+    async with FakeCoverContext(tmp_path, 100.0) as (device, cover):
+        await cover.async_open_cover()
+        assert device.dps["1"] == "on"
+        assert cover.current_cover_position == 100
+        assert not cover.is_opening
+
+
+async def test_fake_set_position_at_estimate(tmp_path):
+    """Test moving to the estimated position sends no command."""
+    async with FakeCoverContext(tmp_path, 50.0) as (device, cover):
+        await cover.async_set_cover_position(position=50)
+        assert device.dps["1"] == "stop"
+        assert device.requests == 0
+
+
+def test_travel_estimate(monkeypatch):
+    """Test position is estimated from the time a cover has been moving."""
+    now = [100.0]
+    monkeypatch.setattr(cover_module, "monotonic", lambda: now[0])
+    travel = CoverTravel(10.0, 20.0)
+    assert travel.time_to(70.0) == 5.0
+
+    travel.start(1)
+    now[0] += 5
+    assert travel.position == 70.0
+    now[0] += 10
+    assert travel.position == 100.0
+
+    # Reversing starts from the estimated position
+    travel.start(-1)
+    now[0] += 2.5
+    assert travel.position == 75.0
+    travel.stop()
+    now[0] += 10
+    assert travel.position == 75.0
+    assert travel.direction == 0
+
+    travel.stop(30.0)
+    assert travel.position == 30.0
+
+
+def test_position_samples(monkeypatch):
+    """Test position is extrapolated from the last two reported positions."""
+    now = [100.0]
+    monkeypatch.setattr(cover_module, "monotonic", lambda: now[0])
+    samples = PositionSamples()
+    assert samples.position is None
+    samples.add(None)
+    assert samples.position is None
+
+    samples.add(10)
+    now[0] += 1
+    assert samples.position == 10
+
+    samples.add(20)
+    now[0] += 0.5
+    assert samples.position == 25
+    # Not extrapolated by more than the interval between the samples
+    now[0] += 5
+    assert samples.position == 30
+
+    # Repeated positions are no change
+    samples.add(20)
+    assert samples.last_change == 101.0
+    samples.add(95)
+    now[0] += 1
+    assert samples.position == 100
+
+
+def test_position_samples_reset(monkeypatch):
+    """Test a new movement does not continue at the previous speed."""
+    now = [100.0]
+    monkeypatch.setattr(cover_module, "monotonic", lambda: now[0])
+    samples = PositionSamples()
+    samples.add(10)
+    now[0] += 1
+    samples.add(20)
+    now[0] += 1
+    samples.reset()
+    assert samples.last_change == 102.0
+    assert samples.position == 20
@@ -0,0 +1,66 @@
+"""Tests for framing of messages."""
+import binascii
+
+import pytest
+
+import pytuya
+from pytuya import MessageDecoder, TuyaMessage, pack_message
+
+RETCODE = b"\x00\x00\x00\x00"
+
+
+def device_message(seqno, payload):
+    """Return bytes of a message as sent by a device, with return code."""
+    return pack_message(TuyaMessage(seqno, pytuya.STATUS_PUSH, 0, RETCODE + payload, 0))
+
+
+def test_pack_and_unpack():
+    """Test a message survives packing and unpacking."""
+    data = device_message(1, b"payload")
+    msg = pytuya.unpack_message(data)
+    assert msg.seqno == 1
+    assert msg.cmd == pytuya.STATUS_PUSH
+    assert msg.payload == b"payload"
+
+
+def test_message_without_retcode():
+    """Test messages without return code, like pushes of 3.3 devices."""
+    payload = b"3.3" + b"\x00" * 12 + b"encrypted"
+    data = pack_message(TuyaMessage(1, pytuya.STATUS_PUSH, 0, payload, 0))
+    data += device_message(2, b"")
+    messages = MessageDecoder().feed(data)
+    assert [msg.payload for msg in messages] == [payload, b""]
+
+
+def test_messages_split_in_chunks():
+    """Test messages fed in chunks of any size are reassembled."""
+    data = device_message(1, b"first") + device_message(2, b"second")
+    for size in (1, 3, 7, len(data)):
+        decoder = MessageDecoder()
+        messages = []
+        for start in range(0, len(data), size):
+            messages += decoder.feed(data[start : start + size])
+        assert [msg.payload for msg in messages] == [b"first", b"second"]
+
+
+def test_garbage_between_messages_is_skipped():
+    """Test decoding resumes at the next message after garbage."""
+    data = b"garbage" + device_message(1, b"first") + b"\x00\x55" + device_message(
+        2, b"second"
+    )
+    messages = MessageDecoder().feed(data)
+    assert [msg.payload for msg in messages] == [b"first", b"second"]
+
+
+def test_bad_crc_is_dropped():
+    """Test a message with a bad CRC is dropped, the next one is kept."""
+    bad = bytearray(device_message(1, b"first"))
+    bad[-8:-4] = (binascii.crc32(b"wrong")).to_bytes(4, "big")
+    messages = MessageDecoder().feed(bytes(bad) + device_message(2, b"second"))
+    assert [msg.payload for msg in messages] == [b"second"]
+
+
+def test_unpack_invalid_data():
+    """Test unpacking data without a valid message raises DecodeError."""
+    with pytest.raises(pytuya.DecodeError):
+        pytuya.unpack_message(b"garbage")
@@ -0,0 +1,145 @@
+"""Tests for retrying device operations and the circuit breaker."""
+import asyncio
+
+import pytest
+
+from custom_components.localtuya.retry import CircuitBreaker, RetryPolicy
+
+
+class Operation:
+    """Operation failing with the given errors before it succeeds."""
+
+    def __init__(self, *errors):
+        """Initialize a new Operation."""
+        self._errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        """Run the operation."""
+        self.calls += 1
+        if self._errors:
+            raise self._errors.pop(0)
+        return "result"
+
+
+def test_retry_delay():
+    """Test delays grow exponentially up to the maximum, with jitter."""
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0)
+    for attempt, delay in enumerate((0.5, 1.0, 2.0, 4.0, 4.0)):
+        assert delay / 2 <= policy.delay(attempt) <= delay
+
+
+async def test_retry_transient_errors():
+    """Test network errors and timeouts are retried."""
+    operation = Operation(OSError(), asyncio.TimeoutError())
+    policy = RetryPolicy(attempts=3, base_delay=0.01)
+    assert await policy.run(operation) == "result"
+    assert operation.calls == 3
+
+
+async def test_retry_gives_up_after_attempts():
+    """Test the error of the last attempt is raised."""
+    operation = Operation(OSError(1, "first"), OSError(2, "second"))
+    policy = RetryPolicy(attempts=2, base_delay=0.01)
+    with pytest.raises(OSError, match="second"):
+        await policy.run(operation)
+    assert operation.calls == 2
+
+
+async def test_retry_not_retryable():
+    """Test other errors are raised without retrying."""
+    operation = Operation(ValueError())
+    policy = RetryPolicy(attempts=3, base_delay=0.01)
+    with pytest.raises(ValueError):
+        await policy.run(operation)
+    assert operation.calls == 1
+
+
+async def test_retry_deadline():
+    """Test a call never runs past its deadline."""
+    loop = asyncio.get_event_loop()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    policy = RetryPolicy(attempts=3, base_delay=0.01, deadline=0.1)
+    start = loop.time()
+    with pytest.raises(asyncio.TimeoutError):
+        await policy.run(hang)
+    assert loop.time() - start < 0.5
+
+
+async def test_retry_not_past_deadline():
+    """Test no retry is made if its delay would pass the deadline."""
+    operation = Operation(OSError())
+    policy = RetryPolicy(attempts=3, base_delay=1.0, deadline=0.5)
+    with pytest.raises(OSError):
+        await policy.run(operation)
+    assert operation.calls == 1
+
+
+async def test_breaker_opens_after_failures():
+    """Test the breaker opens once failures in a row reach the threshold."""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert 29 < breaker.retry_in <= 30
+
+    # Operations started before the breaker opened do not keep it open longer
+    breaker.record_failure()
+    assert breaker.reset_timeout == 30
+
+
+async def test_breaker_probe():
+    """Test a single probe is allowed once the reset timeout passed."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    await asyncio.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    # A failed probe opens the breaker for twice as long
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.reset_timeout == 0.1
+    await asyncio.sleep(0.11)
+    assert breaker.allow_request()
+
+    # A successful probe closes it
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.reset_timeout == 0.05
+    assert breaker.failures == 0
+
+
+async def test_breaker_max_reset_timeout():
+    """Test the reset timeout does not grow past the maximum."""
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=0.02, max_reset_timeout=0.03
+    )
+    breaker.record_failure()
+    await asyncio.sleep(0.03)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.reset_timeout == 0.03
+
+
+async def test_breaker_cancelled_probe():
+    """Test a cancelled probe lets another one through."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    await asyncio.sleep(0.02)
+    assert breaker.allow_request()
+    breaker.record_cancelled()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
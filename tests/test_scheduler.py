@@ -0,0 +1,171 @@
+"""Tests for the poll scheduler and reconnect coordinator."""
+import asyncio
+
+from custom_components.localtuya import scheduler as scheduler_module
+from custom_components.localtuya.scheduler import (
+    OUTAGE_MIN_DEVICES,
+    PollScheduler,
+    ReconnectCoordinator,
+)
+from hass_helpers import home_assistant
+
+
+class Device:
+    """Device recording when it is polled."""
+
+    def __init__(self, loop, duration=0):
+        """Initialize a new Device."""
+        self._loop = loop
+        self._duration = duration
+        self.polls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def poll(self):
+        """Record a poll taking duration seconds."""
+        self.polls.append(self._loop.time())
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self._duration)
+        finally:
+            self.running -= 1
+
+    # Reconnects are recorded like polls
+    connect = poll
+
+
+async def test_polls_spread_by_rate(tmp_path):
+    """Test polls of all devices start no faster than the poll rate."""
+    async with home_assistant(tmp_path) as hass:
+        scheduler = PollScheduler(hass, rate=20)
+        devices = [Device(hass.loop) for _ in range(4)]
+        for key, device in enumerate(devices):
+            scheduler.async_add(key, device.poll, 0.01)
+        await asyncio.sleep(0.3)
+        scheduler.async_stop()
+    starts = sorted(time for device in devices for time in device.polls[:1])
+    assert len(starts) == 4
+    for previous, start in zip(starts, starts[1:]):
+        assert start - previous >= 0.045
+
+
+async def test_polls_limited_in_flight(tmp_path):
+    """Test no more than max_in_flight polls run at once."""
+    async with home_assistant(tmp_path) as hass:
+        scheduler = PollScheduler(hass, rate=1000, max_in_flight=2)
+        device = Device(hass.loop, duration=0.05)
+        for key in range(5):
+            scheduler.async_add(key, device.poll, 0.01)
+        await asyncio.sleep(0.3)
+        scheduler.async_stop()
+    assert len(device.polls) >= 5
+    assert device.max_running == 2
+
+
+async def test_removed_device_not_polled(tmp_path):
+    """Test a device is no longer polled once removed."""
+    async with home_assistant(tmp_path) as hass:
+        scheduler = PollScheduler(hass, rate=1000)
+        removed = Device(hass.loop)
+        kept = Device(hass.loop)
+        remove = scheduler.async_add("removed", removed.poll, 0.01)
+        scheduler.async_add("kept", kept.poll, 0.01)
+        remove()
+        await asyncio.sleep(0.1)
+        scheduler.async_stop()
+    assert not removed.polls
+    assert kept.polls
+
+
+async def test_device_polled_after_interval(tmp_path):
+    """Test a device is polled again one interval after its poll finished."""
+    async with home_assistant(tmp_path) as hass:
+        scheduler = PollScheduler(hass, rate=1000)
+        device = Device(hass.loop, duration=0.05)
+        scheduler.async_add("device", device.poll, 0.1)
+        await asyncio.sleep(0.45)
+        scheduler.async_stop()
+    assert len(device.polls) >= 2
+    for previous, start in zip(device.polls, device.polls[1:]):
+        # Interval plus poll duration, less the jitter
+        assert start - previous >= 0.05 + 0.1 * 0.9
+
+
+async def test_shorter_interval_brings_poll_forward(tmp_path, monkeypatch):
+    """Test a poll due later than the new interval is brought forward."""
+    # Random delays at their maximum, so the first poll is one interval away
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: high)
+    async with home_assistant(tmp_path) as hass:
+        scheduler = PollScheduler(hass, rate=1000)
+        device = Device(hass.loop)
+        scheduler.async_add("device", device.poll, 100)
+        await asyncio.sleep(0.05)
+        assert not device.polls
+        scheduler.async_set_interval("device", 0.05)
+        await asyncio.sleep(0.1)
+        scheduler.async_stop()
+    assert len(device.polls) == 1
+
+
+async def test_reconnect_after_delay(tmp_path):
+    """Test a device is reconnected after the delay, unless cancelled."""
+    async with home_assistant(tmp_path) as hass:
+        reconnects = ReconnectCoordinator(hass)
+        device = Device(hass.loop)
+        cancelled = Device(hass.loop)
+        start = hass.loop.time()
+        reconnects.async_schedule("device", device.connect, 0.05)
+        reconnects.async_schedule("cancelled", cancelled.connect, 0.05)()
+        await asyncio.sleep(0.1)
+        reconnects.async_stop()
+    assert len(device.polls) == 1
+    assert device.polls[0] - start >= 0.05
+    assert not cancelled.polls
+
+
+async def test_outage_reconnects_spread(tmp_path, monkeypatch):
+    """Test reconnects are spread once several devices failed together."""
+    # Random delays at their maximum
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(scheduler_module, "OUTAGE_SPREAD", 0.1)
+    async with home_assistant(tmp_path) as hass:
+        reconnects = ReconnectCoordinator(hass)
+        devices = [Device(hass.loop) for _ in range(4)]
+        start = hass.loop.time()
+        for key, device in enumerate(devices[:3]):
+            reconnects.async_schedule(key, device.connect, 0)
+        reconnects.async_schedule(3, devices[3].connect, 0, priority=True)
+        await asyncio.sleep(0.1)
+        # Devices failing before the outage was noticed are not delayed, nor
+        # are those flagged as priority
+        assert [bool(device.polls) for device in devices] == [True, True, False, True]
+        await asyncio.sleep(0.3)
+        reconnects.async_stop()
+    assert devices[2].polls[0] - start >= 3 * 0.1
+
+
+async def test_flapping_device_not_spread(tmp_path, monkeypatch):
+    """Test a device failing repeatedly does not look like an outage."""
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: high)
+    async with home_assistant(tmp_path) as hass:
+        reconnects = ReconnectCoordinator(hass)
+        device = Device(hass.loop)
+        for _ in range(OUTAGE_MIN_DEVICES):
+            reconnects.async_schedule("device", device.connect, 0)
+        await asyncio.sleep(0.05)
+        reconnects.async_stop()
+    assert len(device.polls) == OUTAGE_MIN_DEVICES
+
+
+async def test_reconnects_limited_in_flight(tmp_path):
+    """Test no more than max_in_flight reconnects run at once."""
+    async with home_assistant(tmp_path) as hass:
+        reconnects = ReconnectCoordinator(hass, max_in_flight=2)
+        device = Device(hass.loop, duration=0.05)
+        for key in range(4):
+            reconnects.async_schedule(key, device.connect, 0, priority=True)
+        await asyncio.sleep(0.2)
+        reconnects.async_stop()
+    assert len(device.polls) == 4
+    assert device.max_running == 2